@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Utilidades compartidas por las cachés en disco (análisis y renderizado).
+
+Solo depende de la biblioteca estándar, así que el renderer puede usarlas sin
+cargar el analizador de música.
+"""
+
+import hashlib
+import os
+
+# Directorio base de las cachés de ReelSense
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "reelsense")
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """
+    Calcula el hash SHA-256 de un archivo leyéndolo por bloques.
+    
+    Args:
+        path: Ruta al archivo
+        
+    Returns:
+        Hash en hexadecimal
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Kernels compilados con Numba para características de audio.
+"""
+
+from typing import Tuple
+
+import numba
+import numpy as np
+
+
+@numba.njit(cache=True, fastmath=True, parallel=True)
+def _centroid_kernel(S: np.ndarray, freqs: np.ndarray) -> np.ndarray:
+    n_bins, n_frames = S.shape
+    centroids = np.zeros(n_frames)
+    for t in numba.prange(n_frames):
+        weighted = 0.0
+        total = 0.0
+        for k in range(n_bins):
+            weighted += freqs[k] * S[k, t]
+            total += S[k, t]
+        if total > 0.0:
+            centroids[t] = weighted / total
+    return centroids
+
+
+def spectral_centroid(S: np.ndarray, sr: int, n_fft: int) -> np.ndarray:
+    """
+    Calcula el centroide espectral de cada trama (equivalente a
+    librosa.feature.spectral_centroid con S=).
+
+    Args:
+        S: Espectrograma de magnitud (frecuencias x tramas)
+        sr: Frecuencia de muestreo
+        n_fft: Tamaño de la FFT con la que se calculó S
+
+    Returns:
+        Centroide en Hz por trama (0 en tramas silenciosas)
+    """
+    freqs = np.fft.rfftfreq(n_fft, d=1.0 / sr)
+    return _centroid_kernel(S, freqs)
+
+
+@numba.njit(cache=True, fastmath=True, parallel=True)
+def _trim_silence_kernel(y: np.ndarray, frame_length: int, hop_length: int, top_db: float):
+    n = y.shape[0]
+    n_frames = 1 + max(0, n - frame_length) // hop_length
+    power = np.zeros(n_frames)
+    for i in numba.prange(n_frames):
+        start = i * hop_length
+        end = min(start + frame_length, n)
+        acc = 0.0
+        for j in range(start, end):
+            acc += y[j] * y[j]
+        power[i] = acc / (end - start)
+    
+    threshold = power.max() * 10.0 ** (-top_db / 10.0)
+    if threshold <= 0.0:
+        return 0, n
+    first = 0
+    while power[first] <= threshold:
+        first += 1
+    last = n_frames - 1
+    while power[last] <= threshold:
+        last -= 1
+    return first * hop_length, min(last * hop_length + frame_length, n)
+
+
+def trim_silence(y: np.ndarray, top_db: float = 60.0, frame_length: int = 2048,
+                 hop_length: int = 512) -> Tuple[int, int]:
+    """
+    Localiza el tramo con sonido, sin el silencio inicial y final (como
+    librosa.effects.trim, con tramas sin centrar).
+    
+    Args:
+        y: Audio mono
+        top_db: Decibelios por debajo del pico de potencia que cuentan como silencio
+        frame_length: Muestras por trama
+        hop_length: Muestras entre tramas
+        
+    Returns:
+        (inicio, fin) en muestras; todo el audio si es silencio puro o está vacío
+    """
+    if y.size == 0:
+        return 0, 0
+    start, end = _trim_silence_kernel(y, frame_length, hop_length, top_db)
+    return int(start), int(end)
+
+
+def warmup() -> None:
+    """Compila (o carga de la caché de Numba) los kernels antes del primer análisis."""
+    spectral_centroid(np.ones((3, 2), dtype=np.float32), 4, 4)
+    trim_silence(np.ones(8, dtype=np.float32), frame_length=4, hop_length=2)
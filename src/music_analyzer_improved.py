@@ -3,83 +3,402 @@
 Versión mejorada del analizador de música con transcripción más precisa.
 """
 
-import whisper
-import librosa
-import soundfile as sf
-from textblob import TextBlob
+import functools
+import importlib.util
+import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import ahocorasick
 import os
 import argparse
 import numpy as np
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, List, Optional, Set, Callable
 import re
 
+from cache_utils import DEFAULT_CACHE_DIR, file_sha256
+
+# Frecuencia de muestreo que espera Whisper
+WHISPER_SAMPLE_RATE = 16000
+
+# Backends de transcripción: "auto" usa faster-whisper (CTranslate2) si está
+# instalado y, si no, el Whisper de referencia (PyTorch)
+WHISPER_BACKENDS = ("auto", "openai-whisper", "faster-whisper")
+
+# Corte del filtro paso bajo del preprocesamiento (en Hz, independiente de sr)
+LOWPASS_CUTOFF_HZ = 2205.0
+
+# Palabras comunes en inglés (para la confianza de la transcripción)
+_COMMON_WORDS = frozenset({"the", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by"})
+
+# Formatos que se leen directamente con soundfile (sin pasar por audioread/ffmpeg)
+SOUNDFILE_EXTENSIONS = ('.wav', '.flac', '.ogg')
+# Tramas por bloque al mezclar a mono archivos multicanal
+_DOWNMIX_BLOCK_FRAMES = 65536
+
+# Parámetros del espectrograma compartido en el análisis de características.
+# Solo se reportan promedios, así que se usan ventanas sin solapamiento
+# (hop = n_fft): 4x menos tramas con medias prácticamente iguales (<0.1%).
+# n_fft se mantiene en 2048 para no alterar el umbral de magnitud del pitch.
+FEATURE_N_FFT = 2048
+FEATURE_HOP_LENGTH = FEATURE_N_FFT
+
+# Caché en disco de resultados de análisis (clave: contenido del archivo + modelo).
+# Incrementar ANALYSIS_CACHE_VERSION cuando cambie el formato o el cálculo del resultado.
+ANALYSIS_CACHE_VERSION = 3
+
+# Segundos de audio (centrados en la canción) usados para estimar el tempo
+TEMPO_WINDOW_SECONDS = 60
+
+
+@functools.lru_cache(maxsize=4)
+def _load_whisper(model_size: str, device: str):
+    """
+    Carga un modelo Whisper una sola vez por proceso.
+    
+    Args:
+        model_size: Tamaño del modelo Whisper
+        device: Dispositivo donde cargar el modelo ("cpu" o "cuda")
+        
+    Returns:
+        Modelo Whisper cargado (compartido entre instancias)
+    """
+    import whisper
+    
+    return whisper.load_model(model_size, device=device)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_faster_whisper(model_size: str, device: str, compute_type: str):
+    """
+    Carga un modelo faster-whisper una sola vez por proceso.
+    
+    Args:
+        model_size: Tamaño del modelo Whisper
+        device: Dispositivo donde cargar el modelo ("cpu" o "cuda")
+        compute_type: Tipo de cómputo de CTranslate2 ("int8", "int8_float16", "float16"...)
+        
+    Returns:
+        Modelo faster-whisper cargado (compartido entre instancias)
+    """
+    from faster_whisper import WhisperModel
+    
+    return WhisperModel(model_size, device=device, compute_type=compute_type)
+
+
+def resolve_backend(backend: str) -> str:
+    """
+    Resuelve el backend de transcripción a usar.
+    
+    Args:
+        backend: Uno de WHISPER_BACKENDS
+        
+    Returns:
+        "openai-whisper" o "faster-whisper"
+    """
+    if backend not in WHISPER_BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend} (opciones: {', '.join(WHISPER_BACKENDS)})")
+    if backend == "auto":
+        return "faster-whisper" if importlib.util.find_spec("faster_whisper") else "openai-whisper"
+    return backend
+
+
+def clear_model_cache() -> None:
+    """Libera los modelos Whisper cacheados (útil en pruebas)."""
+    _load_whisper.cache_clear()
+    _load_faster_whisper.cache_clear()
+
+
+@functools.lru_cache(maxsize=1)
+def _sentiment_analyzer():
+    """
+    Obtiene el analizador de sentimiento de Pattern que usa TextBlob.
+    
+    Se llama directamente en lugar de construir un TextBlob por texto, lo que
+    evita crear el objeto y la namedtuple en cada llamada (mismos resultados).
+    
+    Returns:
+        Función texto -> (polaridad, subjetividad)
+    """
+    from textblob.en import sentiment
+    
+    return sentiment
+
+
+def _read_soundfile(audio_path: str) -> Tuple[np.ndarray, int]:
+    """
+    Lee con soundfile un archivo en mono float32 a su frecuencia original.
+    
+    Args:
+        audio_path: Ruta al archivo de audio (WAV, FLAC u OGG)
+        
+    Returns:
+        Tupla (audio, frecuencia de muestreo)
+    """
+    import soundfile as sf
+    
+    with sf.SoundFile(audio_path) as f:
+        if f.channels == 1:
+            return f.read(dtype='float32'), f.samplerate
+        
+        # Mezclar a mono por bloques: nunca se materializa el buffer multicanal completo
+        audio = np.empty(f.frames, dtype=np.float32)
+        pos = 0
+        for block in f.blocks(blocksize=_DOWNMIX_BLOCK_FRAMES, dtype='float32'):
+            np.mean(block, axis=1, out=audio[pos:pos + len(block)])
+            pos += len(block)
+        return audio[:pos], f.samplerate
+
+
+def load_audio(audio_path: str, sr: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """
+    Carga un archivo de audio en mono float32.
+    
+    Los formatos que libsndfile lee de forma nativa (WAV, FLAC, OGG) se leen
+    directamente con soundfile; el resto (MP3, M4A...) pasa por librosa.
+    
+    Args:
+        audio_path: Ruta al archivo de audio
+        sr: Frecuencia de muestreo deseada (None = la original del archivo)
+        
+    Returns:
+        Tupla (audio, frecuencia de muestreo)
+    """
+    import librosa
+    
+    if not audio_path.lower().endswith(SOUNDFILE_EXTENSIONS):
+        return librosa.load(audio_path, sr=sr, mono=True)
+    
+    audio, native_sr = _read_soundfile(audio_path)
+    if sr is None or sr == native_sr:
+        return audio, native_sr
+    return librosa.resample(audio, orig_sr=native_sr, target_sr=sr), sr
+
+
+def _build_keyword_automaton(*keyword_maps: Dict[str, list]) -> ahocorasick.Automaton:
+    """
+    Compila todas las palabras clave en un autómata Aho-Corasick.
+    
+    Args:
+        keyword_maps: Diccionarios categoría -> lista de palabras clave
+        
+    Returns:
+        Autómata listo para buscar todas las palabras en una sola pasada
+    """
+    automaton = ahocorasick.Automaton()
+    for keyword_map in keyword_maps:
+        for keywords in keyword_map.values():
+            for keyword in keywords:
+                automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+def _build_reverse_index(keyword_map: Dict[str, list]) -> Dict[str, Tuple[str, ...]]:
+    """
+    Invierte un diccionario categoría -> palabras clave.
+    
+    Args:
+        keyword_map: Diccionario categoría -> lista de palabras clave
+        
+    Returns:
+        Diccionario palabra clave -> categorías en las que aparece
+    """
+    index: Dict[str, Tuple[str, ...]] = {}
+    for category, keywords in keyword_map.items():
+        for keyword in keywords:
+            index[keyword] = index.get(keyword, ()) + (category,)
+    return index
+
+
 class ImprovedMusicAnalyzer:
-    def __init__(self, model_size: str = "small"):
+    # Palabras clave de emociones en letras de música
+    EMOTION_KEYWORDS = {
+        "amor": ["love", "heart", "hold me", "romantic", "passion", "forever"],
+        "alegría": ["happy", "joy", "smile", "dance", "celebrate", "fun"],
+        "tristeza": ["sad", "cry", "tears", "pain", "lonely", "hurt"],
+        "energía": ["fire", "burn", "power", "strong", "energy", "wild"],
+        "misterio": ["dark", "moon", "night", "magic", "mystery", "shadow"],
+        "libertad": ["wind", "fly", "free", "escape", "run", "break"],
+        "esperanza": ["hope", "dream", "future", "believe", "faith", "light"]
+    }
+    
+    # Palabras clave de temas musicales comunes
+    THEME_KEYWORDS = {
+        "romance": ["love", "heart", "kiss", "romance", "relationship"],
+        "empoderamiento": ["strong", "power", "freedom", "independent", "confident"],
+        "naturaleza": ["wind", "fire", "earth", "water", "moon", "sun"],
+        "vida": ["life", "live", "die", "birth", "death", "soul"],
+        "música": ["song", "music", "beat", "rhythm", "melody", "voice"],
+        "viaje": ["road", "journey", "travel", "path", "way", "destination"]
+    }
+    
+    _KEYWORD_AUTOMATON = _build_keyword_automaton(EMOTION_KEYWORDS, THEME_KEYWORDS)
+    _EMOTION_BY_KEYWORD = _build_reverse_index(EMOTION_KEYWORDS)
+    _THEME_BY_KEYWORD = _build_reverse_index(THEME_KEYWORDS)
+    
+    # Expresiones regulares del post-procesamiento (compiladas una sola vez)
+    _WS_RE = re.compile(r'\s+')
+    # Frase entre puntos, sin el espacio inicial/final (tras colapsar espacios)
+    _SENTENCE_RE = re.compile(r'[^. ](?:[^.]*[^. ])?')
+    _STRIP_RE = re.compile(r"[^\w\s.,!?\-']")
+    # Ruido: una o dos palabras sueltas (incluye líneas de 1 a 3 letras)
+    _NOISE_RE = re.compile(r'^\s*[A-Za-z]+(?:\s+[A-Za-z]+)?\s*$')
+    
+    def __init__(self, model_size: str = "small", use_cache: bool = True,
+                 cache_dir: Optional[str] = None, backend: str = "auto",
+                 compute_type: Optional[str] = None, sample_rate: Optional[int] = None):
         """
         Inicializa el analizador de música mejorado.
         
         Args:
             model_size: Tamaño del modelo Whisper ("base", "small", "medium", "large")
+            use_cache: Reutilizar análisis previos del mismo archivo (caché en disco)
+            cache_dir: Directorio de la caché (por defecto ~/.cache/reelsense)
+            backend: Backend de transcripción (ver WHISPER_BACKENDS)
+            compute_type: Tipo de cómputo de faster-whisper (por defecto "int8"
+                en CPU e "int8_float16" en GPU)
+            sample_rate: Frecuencia a la que cargar el audio para todo el análisis
+                (None = la original; 16000 evita remuestrear para Whisper y
+                abarata las características espectrales)
         """
+        self.backend = resolve_backend(backend)
+        
+        self.model_size = model_size
+        self.sample_rate = sample_rate
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.compute_type = compute_type
+        
+        # Coeficientes SOS de los filtros, por frecuencia de muestreo
+        self._filter_cache: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    
+    def banner(self) -> None:
+        """Muestra la cabecera del analizador con el modelo y el backend."""
         print(f"🎵 Analizador de Música Mejorado - ReelSense AI")
-        print(f"🔧 Usando modelo Whisper: {model_size}")
+        print(f"🔧 Usando modelo Whisper: {self.model_size} ({self.backend})")
         print("=" * 60)
+    
+    @functools.cached_property
+    def device(self) -> str:
+        """Dispositivo de cómputo ("cuda" o "cpu"); torch se importa solo al consultarlo."""
+        import torch
+        
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    
+    @functools.cached_property
+    def model(self):
+        """
+        Modelo Whisper, cargado la primera vez que se usa (el análisis de
+        sentimiento y la confianza no lo necesitan).
         
+        Returns:
+            Modelo del backend configurado (compartido entre instancias)
+        """
         print("Cargando modelo Whisper...")
-        self.model = whisper.load_model(model_size)
+        if self.backend == "faster-whisper":
+            compute_type = self.compute_type or ("int8_float16" if self.device == "cuda" else "int8")
+            model = _load_faster_whisper(self.model_size, self.device, compute_type)
+        else:
+            model = _load_whisper(self.model_size, self.device)
         print("✅ Modelo cargado exitosamente!")
+        return model
+    
+    @functools.cached_property
+    def transcription_options(self) -> Dict[str, Any]:
+        """Opciones de transcripción del backend configurado."""
+        if self.backend == "faster-whisper":
+            # Configuraciones para mejor transcripción (CTranslate2)
+            return {
+                "language": "en",  # Idioma inglés para música
+                "task": "transcribe",
+                "beam_size": 5,
+                "vad_filter": True  # Saltar tramos sin voz (intros instrumentales)
+            }
         
         # Configuraciones para mejor transcripción
-        self.transcription_options = {
+        return {
             "language": "en",  # Idioma inglés para música
             "task": "transcribe",
-            "fp16": False,  # Usar FP32 para mejor compatibilidad
+            "fp16": self.device == "cuda",  # FP16 en GPU; FP32 en CPU (no soporta FP16)
             "verbose": False
         }
     
-    def preprocess_audio(self, audio_path: str) -> str:
+    def _get_filters(self, sr: int) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Preprocesa el audio para mejorar la transcripción.
+        Obtiene los filtros de preprocesamiento en formato SOS (cacheados por sr).
+        
+        Args:
+            sr: Frecuencia de muestreo
+            
+        Returns:
+            Tupla (filtro paso bajo, filtro paso banda vocal)
+        """
+        filters = self._filter_cache.get(sr)
+        if filters is None:
+            from scipy import signal
+            
+            nyquist = sr / 2
+            # float32 para que sosfiltfilt no promueva el audio a float64
+            sos_low = signal.butter(4, LOWPASS_CUTOFF_HZ / nyquist, 'low', output='sos').astype(np.float32)
+            sos_band = signal.butter(4, [300 / nyquist, 3400 / nyquist], btype='band',
+                                     output='sos').astype(np.float32)
+            filters = (sos_low, sos_band)
+            self._filter_cache[sr] = filters
+        return filters
+    
+    def preprocess_audio(self, audio_path: str) -> Tuple[np.ndarray, int]:
+        """
+        Carga y preprocesa el audio para mejorar la transcripción.
         
         Args:
             audio_path: Ruta al archivo de audio
             
         Returns:
-            Ruta al archivo preprocesado
+            Tupla (audio preprocesado, frecuencia de muestreo)
+        """
+        audio, sr = load_audio(audio_path, self.sample_rate)
+        return self.preprocess_audio_array(audio, sr), sr
+    
+    def preprocess_audio_array(self, audio: np.ndarray, sr: int) -> np.ndarray:
+        """
+        Preprocesa audio ya cargado para mejorar la transcripción.
+        
+        El array de entrada no se modifica.
+        
+        Args:
+            audio: Audio cargado
+            sr: Frecuencia de muestreo
+            
+        Returns:
+            Audio preprocesado
         """
+        from scipy import signal
+        
         print("🔧 Preprocesando audio para mejor transcripción...")
         
-        # Cargar audio
-        audio, sr = librosa.load(audio_path, sr=None)
+        # 1. Normalización de volumen: solo se calcula el pico (sin copiar el
+        #    audio); como los filtros son lineales, la ganancia se aplica al mezclar
+        peak = max(float(audio.max()), -float(audio.min())) if audio.size else 0.0
+        gain = 1.0 / peak if peak > 0 else 1.0
         
-        # 1. Normalización de volumen
-        audio = librosa.util.normalize(audio)
+        sos_low, sos_band = self._get_filters(sr)
+        audio = audio.astype(np.float32, copy=False)
         
         # 2. Reducción de ruido (filtro paso bajo suave)
-        from scipy import signal
-        b, a = signal.butter(4, 0.1, 'low')
-        audio = signal.filtfilt(b, a, audio)
+        audio = signal.sosfiltfilt(sos_low, audio)
         
         # 3. Enfatizar frecuencias vocales (300Hz - 3400Hz)
-        # Crear filtro paso banda para voces
-        nyquist = sr / 2
-        low = 300 / nyquist
-        high = 3400 / nyquist
-        b, a = signal.butter(4, [low, high], btype='band')
-        audio_vocals = signal.filtfilt(b, a, audio)
-        
-        # 4. Mezclar audio original con voces enfatizadas
-        audio_enhanced = 0.7 * audio + 0.3 * audio_vocals
+        audio_vocals = signal.sosfiltfilt(sos_band, audio)
         
-        # 5. Guardar audio preprocesado
-        processed_path = audio_path.replace('.', '_processed.')
-        if audio_path.endswith('.mp3'):
-            processed_path = audio_path.replace('.mp3', '_processed.wav')
+        # 4. Mezclar audio original con voces enfatizadas (in-place, sin temporales)
+        audio *= 0.7 * gain
+        audio_vocals *= 0.3 * gain
+        audio += audio_vocals
+        audio_enhanced = audio
         
-        sf.write(processed_path, audio_enhanced, sr)
-        print(f"✅ Audio preprocesado guardado: {processed_path}")
+        print("✅ Audio preprocesado en memoria")
         
-        return processed_path
+        return audio_enhanced
     
     def transcribe_audio_improved(self, audio_path: str) -> str:
         """
@@ -91,26 +410,55 @@ class ImprovedMusicAnalyzer:
         Returns:
             Texto transcrito mejorado
         """
+        audio, sr = load_audio(audio_path, self.sample_rate)
+        return self.transcribe_audio_improved_array(audio, sr)
+    
+    def transcribe_audio_improved_array(self, audio: np.ndarray, sr: int) -> str:
+        """
+        Transcribe audio ya cargado con mejoras para música.
+        
+        Args:
+            audio: Audio cargado
+            sr: Frecuencia de muestreo
+            
+        Returns:
+            Texto transcrito mejorado
+        """
+        import librosa
+        
         print("📝 Transcribiendo audio con modelo mejorado...")
         
+        import fast_features
+        
         # Preprocesar audio
-        processed_path = self.preprocess_audio(audio_path)
+        audio_enhanced = self.preprocess_audio_array(audio, sr)
+        
+        # Recortar el silencio inicial y final: Whisper no lo transcribe y
+        # así hay menos audio que remuestrear y decodificar
+        start, end = fast_features.trim_silence(audio_enhanced)
+        audio_enhanced = audio_enhanced[start:end]
+        
+        # Whisper acepta directamente un array float32 a 16 kHz
+        audio_16k = librosa.resample(
+            audio_enhanced.astype(np.float32, copy=False), orig_sr=sr, target_sr=WHISPER_SAMPLE_RATE
+        )
         
         # Transcripción con opciones optimizadas
         result = self.model.transcribe(
-            processed_path,
+            audio_16k,
             **self.transcription_options
         )
         
-        transcription = result["text"]
+        if self.backend == "faster-whisper":
+            # faster-whisper devuelve (segmentos, info); los segmentos son un generador
+            segments, _ = result
+            transcription = "".join(segment.text for segment in segments)
+        else:
+            transcription = result["text"]
         
         # Post-procesamiento del texto
         transcription = self.post_process_transcription(transcription)
         
-        # Limpiar archivo temporal
-        if os.path.exists(processed_path):
-            os.remove(processed_path)
-        
         print(f"✅ Transcripción completada: {transcription[:100]}...")
         return transcription
     
@@ -127,43 +475,21 @@ class ImprovedMusicAnalyzer:
         print("🔍 Post-procesando transcripción...")
         
         # 1. Limpiar espacios extra
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        # 2. Corregir errores comunes en música
-        music_corrections = {
-            "I'm gonna": "I'm gonna",
-            "never die": "never die",
-            "Hold me": "Hold me",
-            "in your heart": "in your heart",
-            "tonight": "tonight",
-            "magic": "magic",
-            "dark": "dark",
-            "moonlight": "moonlight",
-            "love": "love",
-            "fire": "fire",
-            "wind": "wind",
-            "world": "world"
-        }
+        text = self._WS_RE.sub(' ', text).strip()
+        
+        # 2. Filtrar frases sin sentido (una sola pasada: cada coincidencia es
+        #    una frase entre puntos, ya sin espacios en los extremos)
+        filtered_lines = (
+            line for line in (m.group() for m in self._SENTENCE_RE.finditer(text))
+            # Más de 3 caracteres, al menos 2 palabras y que no parezca ruido
+            if len(line) > 3 and ' ' in line and not self._is_noise_line(line)
+        )
         
-        # 3. Filtrar frases sin sentido
-        lines = text.split('.')
-        filtered_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if len(line) > 3:  # Solo líneas con más de 3 caracteres
-                # Verificar que la línea tenga sentido básico
-                words = line.split()
-                if len(words) >= 2:  # Al menos 2 palabras
-                    # Filtrar líneas que parecen ser solo ruido
-                    if not self._is_noise_line(line):
-                        filtered_lines.append(line)
-        
-        # 4. Reconstruir texto
+        # 3. Reconstruir texto
         improved_text = '. '.join(filtered_lines)
         
-        # 5. Limpiar caracteres extraños
-        improved_text = re.sub(r'[^\w\s\.\,\!\?\-\']', '', improved_text)
+        # 4. Limpiar caracteres extraños
+        improved_text = self._STRIP_RE.sub('', improved_text)
         
         return improved_text
     
@@ -177,20 +503,7 @@ class ImprovedMusicAnalyzer:
         Returns:
             True si es probablemente ruido
         """
-        # Patrones que indican ruido
-        noise_patterns = [
-            r'^\s*[A-Za-z]\s*$',  # Una sola letra
-            r'^\s*[A-Za-z]{2}\s*$',  # Dos letras
-            r'^\s*[A-Za-z]{3}\s*$',  # Tres letras
-            r'^\s*[A-Za-z]+\s+[A-Za-z]+\s*$',  # Dos palabras muy cortas
-            r'^\s*[A-Za-z]+\s*$',  # Una palabra muy corta
-        ]
-        
-        for pattern in noise_patterns:
-            if re.match(pattern, line):
-                return True
-        
-        return False
+        return self._NOISE_RE.match(line) is not None
     
     def analyze_sentiment_improved(self, text: str) -> Dict[str, Any]:
         """
@@ -204,10 +517,37 @@ class ImprovedMusicAnalyzer:
         """
         print("😊 Analizando sentimiento con mejoras...")
         
+        return self._sentiment_result(text, _sentiment_analyzer())
+    
+    def analyze_sentiment_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analiza el sentimiento de varios textos en una sola llamada.
+        
+        Args:
+            texts: Textos a analizar
+            
+        Returns:
+            Lista de análisis (mismo formato que analyze_sentiment_improved),
+            en el mismo orden que los textos
+        """
+        print(f"😊 Analizando sentimiento de {len(texts)} textos...")
+        
+        sentiment_fn = _sentiment_analyzer()
+        return [self._sentiment_result(text, sentiment_fn) for text in texts]
+    
+    def _sentiment_result(self, text: str, sentiment_fn: Callable[[str], Tuple[float, float]]) -> Dict[str, Any]:
+        """
+        Construye el análisis de sentimiento de un texto.
+        
+        Args:
+            text: Texto a analizar
+            sentiment_fn: Función texto -> (polaridad, subjetividad)
+            
+        Returns:
+            Diccionario con el análisis de sentimiento mejorado
+        """
         # Análisis básico
-        blob = TextBlob(text)
-        polarity = blob.sentiment.polarity
-        subjectivity = blob.sentiment.subjectivity
+        polarity, subjectivity = sentiment_fn(text)
         
         # Interpretación mejorada del sentimiento
         if polarity > 0.2:
@@ -221,11 +561,14 @@ class ImprovedMusicAnalyzer:
         else:
             sentiment = "Neutral"
         
+        # Buscar todas las palabras clave en una sola pasada
+        keywords_found = self._find_keywords(text.lower())
+        
         # Análisis de emociones mejorado para música
-        emotions = self._analyze_music_emotions(text.lower())
+        emotions = self._analyze_music_emotions(keywords_found)
         
         # Análisis de temas musicales
-        themes = self._analyze_music_themes(text.lower())
+        themes = self._analyze_music_themes(keywords_found)
         
         return {
             "text": text,
@@ -237,62 +580,61 @@ class ImprovedMusicAnalyzer:
             "confidence": self._calculate_transcription_confidence(text)
         }
     
-    def _analyze_music_emotions(self, text: str) -> Dict[str, int]:
+    def _find_keywords(self, text: str) -> Set[str]:
         """
-        Analiza emociones específicas de música.
+        Busca las palabras clave de emociones y temas en el texto.
         
         Args:
             text: Texto en minúsculas
             
         Returns:
-            Diccionario con emociones y puntuaciones
+            Conjunto de palabras clave presentes en el texto
         """
-        emotion_keywords = {
-            "amor": ["love", "heart", "hold me", "romantic", "passion", "forever"],
-            "alegría": ["happy", "joy", "smile", "dance", "celebrate", "fun"],
-            "tristeza": ["sad", "cry", "tears", "pain", "lonely", "hurt"],
-            "energía": ["fire", "burn", "power", "strong", "energy", "wild"],
-            "misterio": ["dark", "moon", "night", "magic", "mystery", "shadow"],
-            "libertad": ["wind", "fly", "free", "escape", "run", "break"],
-            "esperanza": ["hope", "dream", "future", "believe", "faith", "light"]
-        }
+        return {keyword for _, keyword in self._KEYWORD_AUTOMATON.iter(text)}
+    
+    @staticmethod
+    def _count_categories(keywords_found: Set[str], index: Dict[str, Tuple[str, ...]],
+                          categories: Dict[str, list]) -> Dict[str, int]:
+        """
+        Cuenta las palabras clave encontradas por categoría.
         
-        emotions = {emotion: 0 for emotion in emotion_keywords.keys()}
+        Args:
+            keywords_found: Palabras clave presentes en el texto
+            index: Índice inverso palabra clave -> categorías
+            categories: Diccionario original (define el orden del resultado)
+            
+        Returns:
+            Diccionario con las categorías presentes y su puntuación
+        """
+        counts = Counter()
+        for keyword in keywords_found:
+            counts.update(index.get(keyword, ()))
         
-        for emotion, keywords in emotion_keywords.items():
-            for keyword in keywords:
-                if keyword in text:
-                    emotions[emotion] += 1
+        return {category: counts[category] for category in categories if counts[category] > 0}
+    
+    def _analyze_music_emotions(self, keywords_found: Set[str]) -> Dict[str, int]:
+        """
+        Analiza emociones específicas de música.
         
-        return {k: v for k, v in emotions.items() if v > 0}
+        Args:
+            keywords_found: Palabras clave presentes en el texto
+            
+        Returns:
+            Diccionario con emociones y puntuaciones
+        """
+        return self._count_categories(keywords_found, self._EMOTION_BY_KEYWORD, self.EMOTION_KEYWORDS)
     
-    def _analyze_music_themes(self, text: str) -> Dict[str, int]:
+    def _analyze_music_themes(self, keywords_found: Set[str]) -> Dict[str, int]:
         """
         Analiza temas musicales comunes.
         
         Args:
-            text: Texto en minúsculas
+            keywords_found: Palabras clave presentes en el texto
             
         Returns:
             Diccionario con temas y puntuaciones
         """
-        theme_keywords = {
-            "romance": ["love", "heart", "kiss", "romance", "relationship"],
-            "empoderamiento": ["strong", "power", "freedom", "independent", "confident"],
-            "naturaleza": ["wind", "fire", "earth", "water", "moon", "sun"],
-            "vida": ["life", "live", "die", "birth", "death", "soul"],
-            "música": ["song", "music", "beat", "rhythm", "melody", "voice"],
-            "viaje": ["road", "journey", "travel", "path", "way", "destination"]
-        }
-        
-        themes = {theme: 0 for theme in theme_keywords.keys()}
-        
-        for theme, keywords in theme_keywords.items():
-            for keyword in keywords:
-                if keyword in text:
-                    themes[theme] += 1
-        
-        return {k: v for k, v in themes.items() if v > 0}
+        return self._count_categories(keywords_found, self._THEME_BY_KEYWORD, self.THEME_KEYWORDS)
     
     def _calculate_transcription_confidence(self, text: str) -> float:
         """
@@ -304,20 +646,17 @@ class ImprovedMusicAnalyzer:
         Returns:
             Puntuación de confianza (0-1)
         """
-        if not text or text.strip() == "":
+        # Tokenizar una sola vez
+        words = text.lower().split()
+        word_count = len(words)
+        
+        if word_count == 0:
             return 0.0
         
         # Factores de confianza
-        word_count = len(text.split())
         sentence_count = len([s for s in text.split('.') if s.strip()])
-        
-        # Palabras comunes en inglés
-        common_words = ["the", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by"]
-        common_word_count = sum(1 for word in text.lower().split() if word in common_words)
-        
-        # Calcular confianza
-        if word_count == 0:
-            return 0.0
+        # La pertenencia al frozenset se evalúa en C (map), sin bucle de Python por palabra
+        common_word_count = sum(map(_COMMON_WORDS.__contains__, words))
         
         # Más palabras = más confianza
         word_confidence = min(word_count / 50.0, 1.0)
@@ -333,6 +672,100 @@ class ImprovedMusicAnalyzer:
         
         return round(confidence, 3)
     
+    def _cache_path(self, cache_key: str) -> str:
+        """
+        Obtiene la ruta del archivo de caché para una clave.
+        
+        Args:
+            cache_key: Clave de caché
+            
+        Returns:
+            Ruta al archivo JSON de la caché
+        """
+        return os.path.join(self.cache_dir, f"{cache_key}.json")
+    
+    def _read_cache(self, audio_path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Busca un análisis previo del mismo contenido de audio.
+        
+        Args:
+            audio_path: Ruta al archivo de audio
+            
+        Returns:
+            Tupla (clave de caché, resultado cacheado o None)
+        """
+        cache_key = (f"{file_sha256(audio_path)}-{self.model_size}-{self.backend}"
+                     f"-sr{self.sample_rate or 'native'}-v{ANALYSIS_CACHE_VERSION}")
+        try:
+            with open(self._cache_path(cache_key), 'r', encoding='utf-8') as f:
+                return cache_key, json.load(f)
+        except (OSError, ValueError):
+            return cache_key, None
+    
+    def _write_cache(self, cache_key: str, result: Dict[str, Any]) -> None:
+        """
+        Guarda un resultado en la caché (escritura atómica; los fallos no son fatales).
+        
+        Args:
+            cache_key: Clave de caché
+            result: Resultado del análisis
+        """
+        cache_path = self._cache_path(cache_key)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"⚠️  No se pudo guardar la caché del análisis: {e}")
+    
+    def _load_segment(self, audio_path: str) -> Tuple[Optional[str], Optional[Dict[str, Any]],
+                                                       Optional[np.ndarray], int]:
+        """
+        Verifica que el archivo existe, consulta la caché y, si no hay
+        resultado previo, carga el audio una sola vez.
+        
+        Args:
+            audio_path: Ruta al archivo de audio
+            
+        Returns:
+            Tupla (clave de caché, resultado cacheado, audio, frecuencia de muestreo);
+            si hay resultado cacheado no se carga el audio (None, 0)
+        """
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"No se encontró el archivo: {audio_path}")
+        
+        cache_key, cached = self._read_cache(audio_path) if self.use_cache else (None, None)
+        if cached is not None:
+            return cache_key, cached, None, 0
+        
+        audio, sr = load_audio(audio_path, self.sample_rate)
+        return cache_key, None, audio, sr
+    
+    def _finish_segment(self, audio_path: str, loaded: Tuple[Optional[str], Optional[Dict[str, Any]],
+                                                             Optional[np.ndarray], int]) -> Dict[str, Any]:
+        """
+        Devuelve el resultado cacheado o analiza el audio cargado y lo guarda en caché.
+        
+        Args:
+            audio_path: Ruta al archivo de audio
+            loaded: Resultado de _load_segment
+            
+        Returns:
+            Diccionario con toda la información del análisis
+        """
+        cache_key, cached, audio, sr = loaded
+        if cached is not None:
+            print(f"♻️  Usando análisis en caché para {audio_path}")
+            cached["audio_info"]["file_path"] = audio_path
+            return cached
+        
+        result = self._analyze_loaded_segment(audio_path, audio, sr)
+        if cache_key is not None:
+            self._write_cache(cache_key, result)
+        return result
+    
     def analyze_music_segment(self, audio_path: str) -> Dict[str, Any]:
         """
         Analiza un segmento de música completo con mejoras.
@@ -344,44 +777,109 @@ class ImprovedMusicAnalyzer:
             Diccionario con toda la información del análisis
         """
         try:
-            # Verificar que el archivo existe
-            if not os.path.exists(audio_path):
-                raise FileNotFoundError(f"No se encontró el archivo: {audio_path}")
-            
-            # Obtener información del audio
-            audio, sr = librosa.load(audio_path, sr=None)
-            duration = len(audio) / sr
+            # Cargar el audio una sola vez para todo el análisis (o reutilizar la caché)
+            return self._finish_segment(audio_path, self._load_segment(audio_path))
             
-            # Transcripción mejorada
-            transcription = self.transcribe_audio_improved(audio_path)
-            
-            # Análisis de sentimiento mejorado
-            sentiment_analysis = self.analyze_sentiment_improved(transcription)
+        except Exception as e:
+            print(f"❌ Error durante el análisis: {str(e)}")
+            return {"error": str(e)}
+    
+    def analyze_music_batch(self, audio_paths: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analiza varios segmentos de música, cargando el siguiente archivo en
+        segundo plano mientras se transcribe el actual.
+        
+        Args:
+            audio_paths: Rutas a los archivos de audio
             
-            # Características del audio
-            audio_features = self._analyze_audio_features(audio, sr)
+        Returns:
+            Lista de resultados en el mismo orden que las rutas (con "error"
+            para los archivos que fallen)
+        """
+        results = []
+        if not audio_paths:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(self._load_segment, audio_paths[0])
+            for i, audio_path in enumerate(audio_paths):
+                current = pending
+                if i + 1 < len(audio_paths):
+                    pending = executor.submit(self._load_segment, audio_paths[i + 1])
+                
+                try:
+                    results.append(self._finish_segment(audio_path, current.result()))
+                except Exception as e:
+                    print(f"❌ Error durante el análisis de {audio_path}: {str(e)}")
+                    results.append({"error": str(e)})
+        
+        return results
+    
+    def _analyze_loaded_segment(self, audio_path: str, audio: np.ndarray, sr: int) -> Dict[str, Any]:
+        """
+        Analiza un segmento de música ya cargado en memoria.
+        
+        Args:
+            audio_path: Ruta al archivo de audio (solo informativa)
+            audio: Audio cargado
+            sr: Frecuencia de muestreo
             
-            result = {
-                "audio_info": {
-                    "file_path": audio_path,
-                    "duration_seconds": round(duration, 2),
-                    "sample_rate": sr,
-                    **audio_features
-                },
-                "transcription": transcription,
-                "sentiment_analysis": sentiment_analysis,
-                "analysis_metadata": {
-                    "model_used": str(type(self.model).__name__),
-                    "preprocessing_applied": True,
-                    "post_processing_applied": True
-                }
+        Returns:
+            Diccionario con toda la información del análisis
+        """
+        duration = len(audio) / sr
+        
+        # Transcripción mejorada
+        transcription = self.transcribe_audio_improved_array(audio, sr)
+        
+        # Análisis de sentimiento mejorado
+        sentiment_analysis = self.analyze_sentiment_improved(transcription)
+        
+        # Características del audio
+        audio_features = self._analyze_audio_features(audio, sr)
+        
+        return {
+            "audio_info": {
+                "file_path": audio_path,
+                "duration_seconds": round(duration, 2),
+                "sample_rate": sr,
+                **audio_features
+            },
+            "transcription": transcription,
+            "sentiment_analysis": sentiment_analysis,
+            "analysis_metadata": {
+                "model_used": str(type(self.model).__name__),
+                "preprocessing_applied": True,
+                "post_processing_applied": True
             }
+        }
+    
+    def _magnitude_spectrogram(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Calcula el espectrograma de magnitud usado por las características.
+        
+        En GPU se calcula con torch.stft (misma ventana Hann y relleno que
+        librosa.stft); en CPU se usa librosa.
+        
+        Args:
+            audio: Audio cargado
             
-            return result
+        Returns:
+            Matriz de magnitudes (frecuencias x tramas)
+        """
+        if self.device == "cuda":
+            import torch
             
-        except Exception as e:
-            print(f"❌ Error durante el análisis: {str(e)}")
-            return {"error": str(e)}
+            with torch.no_grad():
+                signal_gpu = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32)).to(self.device)
+                window = torch.hann_window(FEATURE_N_FFT, device=self.device)
+                S = torch.stft(signal_gpu, FEATURE_N_FFT, FEATURE_HOP_LENGTH, window=window,
+                               center=True, pad_mode='constant', return_complex=True).abs()
+                return S.cpu().numpy()
+        
+        import librosa
+        
+        return np.abs(librosa.stft(audio, n_fft=FEATURE_N_FFT, hop_length=FEATURE_HOP_LENGTH))
     
     def _analyze_audio_features(self, audio: Any, sr: int) -> Dict[str, Any]:
         """
@@ -394,18 +892,26 @@ class ImprovedMusicAnalyzer:
         Returns:
             Diccionario con características del audio
         """
+        import librosa
+        import fast_features
+        
         print("🔍 Analizando características avanzadas del audio...")
         
         # Duración
         duration = len(audio) / sr
         
-        # Energía RMS
-        rms = librosa.feature.rms(y=audio)[0]
+        # Energía RMS (en el dominio temporal: no necesita STFT)
+        rms = librosa.feature.rms(y=audio, frame_length=FEATURE_N_FFT,
+                                  hop_length=FEATURE_HOP_LENGTH)[0]
         avg_rms = float(rms.mean())
         
+        # Espectrograma de magnitud compartido por pitch y centroide espectral
+        S = self._magnitude_spectrogram(audio)
+        
         # Frecuencia fundamental (pitch)
         try:
-            pitches, magnitudes = librosa.piptrack(y=audio, sr=sr)
+            pitches, magnitudes = librosa.piptrack(S=S, sr=sr, n_fft=FEATURE_N_FFT,
+                                                   hop_length=FEATURE_HOP_LENGTH)
             pitch_values = pitches[magnitudes > 0.1]
             if len(pitch_values) > 0:
                 avg_pitch = float(pitch_values.mean())
@@ -414,16 +920,18 @@ class ImprovedMusicAnalyzer:
         except Exception:
             avg_pitch = 0.0
         
-        # Tempo
+        # Tempo: estimación global sobre una ventana central (sin seguimiento de beats)
         try:
-            tempo_result = librosa.beat.beat_track(y=audio, sr=sr)
-            tempo = tempo_result[0] if isinstance(tempo_result, tuple) else tempo_result
+            mid = len(audio) // 2
+            half_window = TEMPO_WINDOW_SECONDS * sr // 2
+            window = audio[max(0, mid - half_window):mid + half_window]
+            tempo = float(librosa.feature.tempo(y=window, sr=sr)[0])
         except Exception:
             tempo = 0.0
         
         # Espectral centroid (brillantez)
         try:
-            spectral_centroids = librosa.feature.spectral_centroid(y=audio, sr=sr)[0]
+            spectral_centroids = fast_features.spectral_centroid(S, sr, FEATURE_N_FFT)
             avg_spectral = float(spectral_centroids.mean())
         except Exception:
             avg_spectral = 0.0
@@ -437,31 +945,13 @@ class ImprovedMusicAnalyzer:
             "spectral_centroid": round(float(avg_spectral), 1)
         }
 
-def main():
-    """Función principal del script."""
-    parser = argparse.ArgumentParser(description="Analizador de música mejorado con transcripción precisa")
-    parser.add_argument("audio_path", help="Ruta al archivo de audio")
-    parser.add_argument("--output", "-o", help="Archivo de salida para guardar resultados (opcional)")
-    parser.add_argument("--model", "-m", choices=["base", "small", "medium", "large"], 
-                       default="small", help="Tamaño del modelo Whisper (default: small)")
-    
-    args = parser.parse_args()
-    
-    # Crear instancia del analizador mejorado
-    analyzer = ImprovedMusicAnalyzer(model_size=args.model)
-    
-    # Analizar el segmento de música
-    print("=" * 60)
-    print("ANALIZADOR DE MÚSICA MEJORADO - REELSENSE AI")
-    print("=" * 60)
+def _print_results(results: Dict[str, Any]) -> None:
+    """
+    Muestra un resultado de analyze_music_segment.
     
-    results = analyzer.analyze_music_segment(args.audio_path)
-    
-    if "error" in results:
-        print(f"❌ Error: {results['error']}")
-        return
-    
-    # Mostrar resultados
+    Args:
+        results: Resultado del análisis (sin "error")
+    """
     print("\n" + "=" * 60)
     print("RESULTADOS DEL ANÁLISIS MEJORADO")
     print("=" * 60)
@@ -504,12 +994,59 @@ def main():
     print(f"Modelo Whisper: {metadata['model_used']}")
     print(f"Preprocesamiento: {'✅ Aplicado' if metadata['preprocessing_applied'] else '❌ No aplicado'}")
     print(f"Post-procesamiento: {'✅ Aplicado' if metadata['post_processing_applied'] else '❌ No aplicado'}")
+
+def main():
+    """Función principal del script."""
+    parser = argparse.ArgumentParser(description="Analizador de música mejorado con transcripción precisa")
+    parser.add_argument("audio_paths", nargs="+", metavar="audio_path",
+                       help="Ruta al archivo de audio (con varias, el siguiente archivo se carga "
+                            "mientras se transcribe el actual)")
+    parser.add_argument("--output", "-o", help="Archivo de salida para guardar resultados (opcional; "
+                                               "con varios archivos, una lista JSON en el mismo orden)")
+    parser.add_argument("--model", "-m", choices=["base", "small", "medium", "large"], 
+                       default="small", help="Tamaño del modelo Whisper (default: small)")
+    parser.add_argument("--backend", "-b", choices=WHISPER_BACKENDS, default="auto",
+                       help="Backend de transcripción (default: auto, faster-whisper si está instalado)")
+    parser.add_argument("--compute-type", default=None,
+                       help="Tipo de cómputo de faster-whisper: int8, int8_float16, float16... "
+                            "(default: int8 en CPU, int8_float16 en GPU)")
+    parser.add_argument("--sr", type=int, default=None,
+                       help="Frecuencia de muestreo para el análisis (default: la original del archivo; "
+                            "16000 es la que usa Whisper)")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="No reutilizar ni guardar análisis en caché (~/.cache/reelsense)")
+    
+    args = parser.parse_args()
+    
+    # Crear instancia del analizador mejorado
+    analyzer = ImprovedMusicAnalyzer(model_size=args.model, use_cache=not args.no_cache,
+                                     backend=args.backend, compute_type=args.compute_type,
+                                     sample_rate=args.sr)
+    analyzer.banner()
+    
+    # Analizar el segmento de música
+    print("=" * 60)
+    print("ANALIZADOR DE MÚSICA MEJORADO - REELSENSE AI")
+    print("=" * 60)
+    
+    if len(args.audio_paths) > 1:
+        all_results = analyzer.analyze_music_batch(args.audio_paths)
+    else:
+        all_results = [analyzer.analyze_music_segment(args.audio_paths[0])]
+    
+    for results in all_results:
+        if "error" in results:
+            print(f"❌ Error: {results['error']}")
+        else:
+            _print_results(results)
+    
+    if len(all_results) == 1 and "error" in all_results[0]:
+        return
     
     # Guardar resultados si se especifica
     if args.output:
-        import json
         with open(args.output, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+            json.dump(all_results if len(all_results) > 1 else all_results[0], f, ensure_ascii=False, indent=2)
         print(f"\n💾 Resultados guardados en: {args.output}")
     
     print("\n" + "=" * 60)
@@ -6,36 +6,152 @@ Combina análisis musical y generación de contenido viral para TikTok
 
 import sys
 import os
-import json
 import argparse
-from typing import Dict, Any
+import orjson
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List
 
 # Agregar el directorio actual al path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from music_analyzer_improved import ImprovedMusicAnalyzer
-from tiktok_generator import TikTokReelGenerator
+# Solo constantes: torch/whisper/librosa y openai se cargan al crear los analizadores,
+# así --help y los usos sin TikTok no pagan su importación
+from music_analyzer_improved import WHISPER_BACKENDS, WHISPER_SAMPLE_RATE, resolve_backend
+
+_RESULT_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _write_bytes(output_path: str, data: bytes) -> str:
+    """Escribe data en output_path creando el directorio si hace falta."""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return output_path
+
+
+class BatchResultWriter:
+    """
+    Escribe resultados JSON en segundo plano durante el análisis de muchos archivos.
+    
+    Los resultados se serializan al encolarlos (así pueden modificarse después)
+    y la escritura a disco se hace en un pool de hilos, solapada con el análisis
+    del siguiente archivo.
+    """
+    
+    def __init__(self, max_workers: int = 4):
+        """
+        Args:
+            max_workers: Escrituras simultáneas como máximo
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures: List[Future] = []
+    
+    def submit(self, output_path: str, results: Dict[str, Any]) -> None:
+        """
+        Encola la escritura de un resultado.
+        
+        Args:
+            output_path: Ruta del archivo de salida
+            results: Resultados a guardar en JSON
+        """
+        data = orjson.dumps(results, option=_RESULT_JSON_OPTIONS)
+        self._futures.append(self._executor.submit(_write_bytes, output_path, data))
+    
+    def flush(self) -> List[str]:
+        """
+        Espera a que terminen las escrituras pendientes.
+        
+        Returns:
+            Rutas escritas, en el orden en que se encolaron
+        """
+        futures, self._futures = self._futures, []
+        return [future.result() for future in futures]
+    
+    def close(self) -> None:
+        """Termina las escrituras pendientes y libera el pool."""
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown()
+    
+    def __enter__(self) -> "BatchResultWriter":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
 
 class IntegratedMusicAnalyzer:
-    def __init__(self, openrouter_api_key: str = None, whisper_model: str = "small"):
+    def __init__(self, openrouter_api_key: str = None, whisper_model: str = "small",
+                 whisper_backend: str = "auto", compute_type: str = None,
+                 sample_rate: int = WHISPER_SAMPLE_RATE, use_cache: bool = True,
+                 cache_dir: str = None):
         """
         Inicializa el analizador integrado.
         
+        El constructor solo guarda la configuración: el modelo Whisper y el
+        generador de TikTok se cargan en el primer análisis (ver _ensure_ready).
+        
         Args:
             openrouter_api_key: API key de OpenRouter
             whisper_model: Modelo Whisper a usar
+            whisper_backend: Backend de transcripción (ver WHISPER_BACKENDS)
+            compute_type: Tipo de cómputo de faster-whisper (opcional)
+            sample_rate: Frecuencia de carga del audio (None = la original);
+                por defecto la de Whisper, así el audio se remuestrea una sola vez
+            use_cache: Reutilizar el análisis musical de ejecuciones anteriores
+                sobre el mismo archivo (caché en disco por contenido)
+            cache_dir: Directorio de la caché (por defecto ~/.cache/reelsense)
         """
+        self.openrouter_api_key = openrouter_api_key
+        self.whisper_model = whisper_model
+        self.whisper_backend = whisper_backend
+        self.compute_type = compute_type
+        self.sample_rate = sample_rate
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        
+        self.music_analyzer = None
+        self.tiktok_generator = None
+        self._tiktok_ready = False
+    
+    def banner(self):
+        """Muestra la cabecera del analizador integrado."""
         print("🎵🎬 ANALIZADOR DE MÚSICA INTEGRADO - REELSENSE AI")
+        print(f"🔧 Usando modelo Whisper: {self.whisper_model} ({resolve_backend(self.whisper_backend)})")
         print("=" * 70)
+    
+    def _ensure_ready(self, generate_concepts: bool = True):
+        """
+        Carga bajo demanda el analizador de música y, si se van a generar
+        conceptos, el generador de TikTok.
+        
+        Args:
+            generate_concepts: Si también hace falta el generador de TikTok
+        """
+        if self.music_analyzer is None:
+            from music_analyzer_improved import ImprovedMusicAnalyzer
+            
+            # Inicializar analizador de música
+            self.music_analyzer = ImprovedMusicAnalyzer(
+                model_size=self.whisper_model, backend=self.whisper_backend,
+                compute_type=self.compute_type, sample_rate=self.sample_rate,
+                use_cache=self.use_cache, cache_dir=self.cache_dir
+            )
+            
+            # Compilar (o cargar de la caché) los kernels Numba antes del primer análisis
+            import fast_features
+            fast_features.warmup()
         
-        # Inicializar analizador de música
-        self.music_analyzer = ImprovedMusicAnalyzer(model_size=whisper_model)
+        if not generate_concepts or self._tiktok_ready:
+            return
+        self._tiktok_ready = True
         
         # Inicializar generador de TikTok (opcional)
-        self.tiktok_generator = None
-        if openrouter_api_key:
+        if self.openrouter_api_key:
             try:
-                self.tiktok_generator = TikTokReelGenerator(api_key=openrouter_api_key)
+                from tiktok_generator import TikTokReelGenerator
+                self.tiktok_generator = TikTokReelGenerator(api_key=self.openrouter_api_key)
                 print("✅ Generador de TikTok inicializado con modelo gratuito")
             except Exception as e:
                 print(f"⚠️ Generador de TikTok no disponible: {str(e)}")
@@ -55,6 +171,8 @@ class IntegratedMusicAnalyzer:
         Returns:
             Diccionario con análisis musical y conceptos de TikTok
         """
+        self._ensure_ready(generate_concepts)
+        
         print(f"\n🎵 Analizando música: {audio_path}")
         print("=" * 50)
         
@@ -93,13 +211,16 @@ class IntegratedMusicAnalyzer:
         
         return integrated_result
     
-    def save_integrated_results(self, results: Dict[str, Any], output_path: str = None) -> str:
+    def save_integrated_results(self, results: Dict[str, Any], output_path: str = None,
+                                writer: BatchResultWriter = None) -> str:
         """
         Guarda los resultados integrados en un archivo JSON.
         
         Args:
             results: Resultados del análisis integrado
             output_path: Ruta del archivo de salida
+            writer: BatchResultWriter al que encolar la escritura (opcional;
+                útil al analizar muchos archivos seguidos)
             
         Returns:
             Ruta del archivo guardado
@@ -108,12 +229,13 @@ class IntegratedMusicAnalyzer:
             timestamp = results['music_analysis']['audio_info']['file_path'].split('/')[-1].split('.')[0]
             output_path = f"outputs/integrated_analysis_{timestamp}.json"
         
-        # Crear directorio si no existe
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        if writer is not None:
+            writer.submit(output_path, results)
+            print(f"💾 Resultados integrados encolados para: {output_path}")
+            return output_path
         
-        # Guardar resultados
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        # Guardar resultados (serializado de una vez con orjson; UTF-8 sin escapar)
+        _write_bytes(output_path, orjson.dumps(results, option=_RESULT_JSON_OPTIONS))
         
         print(f"💾 Resultados integrados guardados en: {output_path}")
         return output_path
@@ -125,100 +247,145 @@ class IntegratedMusicAnalyzer:
         Args:
             results: Resultados del análisis integrado
         """
-        print("\n" + "=" * 70)
-        print("🎵🎬 RESULTADOS DEL ANÁLISIS INTEGRADO")
-        print("=" * 70)
+        # Se compone todo el bloque y se escribe de una vez (una sola escritura a stdout)
+        lines = [
+            "",
+            "=" * 70,
+            "🎵🎬 RESULTADOS DEL ANÁLISIS INTEGRADO",
+            "=" * 70,
+        ]
         
         # Mostrar análisis musical
         music_analysis = results['music_analysis']
         audio_info = music_analysis['audio_info']
         sentiment = music_analysis['sentiment_analysis']
         
-        print(f"📁 Archivo: {audio_info['file_path']}")
-        print(f"⏱️  Duración: {audio_info['duration_seconds']} segundos")
-        print(f"🥁 Tempo: {audio_info['tempo_bpm']} BPM")
-        print(f"🎼 Pitch: {audio_info['average_pitch_hz']} Hz")
-        print(f"✨ Brillo: {audio_info['spectral_centroid']}")
-        
-        print(f"\n📝 TRANSCRIPCIÓN:")
-        print(f"'{music_analysis['transcription'][:100]}...'")
-        
-        print(f"\n😊 SENTIMIENTO: {sentiment['sentiment']}")
-        print(f"   Polaridad: {sentiment['polarity']:.3f}")
-        print(f"   Confianza: {sentiment['confidence']:.1%}")
+        lines += [
+            f"📁 Archivo: {audio_info['file_path']}",
+            f"⏱️  Duración: {audio_info['duration_seconds']} segundos",
+            f"🥁 Tempo: {audio_info['tempo_bpm']} BPM",
+            f"🎼 Pitch: {audio_info['average_pitch_hz']} Hz",
+            f"✨ Brillo: {audio_info['spectral_centroid']}",
+            "",
+            "📝 TRANSCRIPCIÓN:",
+            f"'{music_analysis['transcription'][:100]}...'",
+            "",
+            f"😊 SENTIMIENTO: {sentiment['sentiment']}",
+            f"   Polaridad: {sentiment['polarity']:.3f}",
+            f"   Confianza: {sentiment['confidence']:.1%}",
+        ]
         
         if sentiment['emotions']:
-            print(f"   Emociones: {', '.join([f'{k}: {v}' for k, v in sentiment['emotions'].items()])}")
+            lines.append(f"   Emociones: {', '.join([f'{k}: {v}' for k, v in sentiment['emotions'].items()])}")
         
         # Mostrar conceptos de TikTok
         tiktok_concepts = results.get('tiktok_concepts')
         if tiktok_concepts:
-            print(f"\n🎬 CONCEPTOS DE TIKTOK REELS GENERADOS:")
-            print("=" * 50)
+            lines += ["", "🎬 CONCEPTOS DE TIKTOK REELS GENERADOS:", "=" * 50]
             
             for i, concept in enumerate(tiktok_concepts, 1):
-                print(f"\n📱 CONCEPTO {i}: {concept['concept_title']}")
-                print(f"   🎯 Gancho: {concept['viral_hook']}")
-                print(f"   👥 Audiencia: {concept['target_audience']}")
-                print(f"   🏷️ Hashtags: {', '.join(concept['hashtags'][:3])}...")
-                print(f"   ⚡ Potencial: {concept['viral_potential'][:50]}...")
+                lines += [
+                    "",
+                    f"📱 CONCEPTO {i}: {concept['concept_title']}",
+                    f"   🎯 Gancho: {concept['viral_hook']}",
+                    f"   👥 Audiencia: {concept['target_audience']}",
+                    f"   🏷️ Hashtags: {', '.join(concept['hashtags'][:3])}...",
+                    f"   ⚡ Potencial: {concept['viral_potential'][:50]}...",
+                ]
         
         # Metadatos
         metadata = results['analysis_metadata']
-        print(f"\n🔧 METADATOS:")
-        print(f"   Análisis integrado: {'✅ Sí' if metadata['integrated_analysis'] else '❌ No'}")
-        print(f"   Generación TikTok: {'✅ Sí' if metadata['tiktok_generation'] else '❌ No'}")
-        print(f"   Conceptos generados: {metadata['concepts_generated']}")
+        lines += [
+            "",
+            "🔧 METADATOS:",
+            f"   Análisis integrado: {'✅ Sí' if metadata['integrated_analysis'] else '❌ No'}",
+            f"   Generación TikTok: {'✅ Sí' if metadata['tiktok_generation'] else '❌ No'}",
+            f"   Conceptos generados: {metadata['concepts_generated']}",
+        ]
+        
+        sys.stdout.write("\n".join(lines) + "\n")
 
 def main():
     """Función principal del script integrado."""
     parser = argparse.ArgumentParser(
         description="Analizador de música integrado con generador de TikTok reels"
     )
-    parser.add_argument("audio_path", help="Ruta al archivo de audio")
-    parser.add_argument("--output", "-o", help="Archivo de salida para guardar resultados")
+    parser.add_argument("audio_paths", nargs="+", metavar="audio_path",
+                       help="Ruta al archivo de audio (con varias, cada resultado se guarda en "
+                            "outputs/integrated_analysis_<nombre>.json mientras se analiza el siguiente)")
+    parser.add_argument("--output", "-o", help="Archivo de salida para guardar resultados (solo con un archivo)")
     parser.add_argument("--model", "-m", choices=["base", "small", "medium", "large"], 
                        default="small", help="Tamaño del modelo Whisper")
+    parser.add_argument("--backend", "-b", choices=WHISPER_BACKENDS, default="auto",
+                       help="Backend de transcripción (auto: faster-whisper si está instalado)")
+    parser.add_argument("--compute-type", default=None,
+                       help="Tipo de cómputo de faster-whisper (int8, int8_float16, float16...)")
+    parser.add_argument("--sr", type=int, default=WHISPER_SAMPLE_RATE,
+                       help=f"Frecuencia de muestreo del análisis (default: {WHISPER_SAMPLE_RATE}, "
+                            "la de Whisper; 0 = la original del archivo)")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="No reutilizar ni guardar el análisis musical en caché (~/.cache/reelsense)")
     parser.add_argument("--no-tiktok", action="store_true", 
                        help="No generar conceptos de TikTok")
     parser.add_argument("--concepts", "-c", type=int, default=3,
                        help="Número de conceptos de TikTok a generar")
     parser.add_argument("--api-key", help="API key de OpenRouter (opcional)")
+    parser.add_argument("--quiet", "-q", action="store_true",
+                       help="No mostrar la cabecera ni el resumen de resultados (solo guardar el JSON)")
     
     args = parser.parse_args()
     
+    # Fallar antes de cargar ningún modelo
+    for audio_path in args.audio_paths:
+        if not os.path.exists(audio_path):
+            parser.error(f"no existe el archivo de audio: {audio_path}")
+    if args.output and len(args.audio_paths) > 1:
+        parser.error("--output solo admite un archivo de audio")
+    
     # Obtener API key
     api_key = args.api_key or os.getenv('OPENROUTER_API_KEY')
     
     # Crear analizador integrado
     analyzer = IntegratedMusicAnalyzer(
         openrouter_api_key=api_key,
-        whisper_model=args.model
+        whisper_model=args.model,
+        whisper_backend=args.backend,
+        compute_type=args.compute_type,
+        sample_rate=args.sr or None,
+        use_cache=not args.no_cache
     )
+    if not args.quiet:
+        analyzer.banner()
     
-    # Analizar y generar
-    results = analyzer.analyze_and_generate_tiktok(
-        audio_path=args.audio_path,
-        generate_concepts=not args.no_tiktok,
-        concept_count=args.concepts
-    )
-    
-    if "error" in results:
-        print(f"❌ Error: {results['error']}")
-        return
-    
-    # Mostrar resultados
-    analyzer.display_integrated_results(results)
-    
-    # Guardar resultados
-    if args.output:
-        analyzer.save_integrated_results(results, args.output)
-    else:
-        analyzer.save_integrated_results(results)
+    # Con varios archivos, cada JSON se escribe en segundo plano mientras se
+    # analiza el siguiente
+    with BatchResultWriter() as writer:
+        for audio_path in args.audio_paths:
+            # Analizar y generar
+            results = analyzer.analyze_and_generate_tiktok(
+                audio_path=audio_path,
+                generate_concepts=not args.no_tiktok,
+                concept_count=args.concepts
+            )
+            
+            if "error" in results:
+                print(f"❌ Error: {results['error']}")
+                if len(args.audio_paths) == 1:
+                    return
+                continue
+            
+            # Mostrar resultados
+            if not args.quiet:
+                analyzer.display_integrated_results(results)
+            
+            # Guardar resultados
+            analyzer.save_integrated_results(results, args.output,
+                                             writer=writer if len(args.audio_paths) > 1 else None)
     
-    print("\n" + "=" * 70)
-    print("🎵🎬 ¡ANÁLISIS INTEGRADO COMPLETADO!")
-    print("=" * 70)
+    if not args.quiet:
+        print("\n" + "=" * 70)
+        print("🎵🎬 ¡ANÁLISIS INTEGRADO COMPLETADO!")
+        print("=" * 70)
 
 if __name__ == "__main__":
     main()
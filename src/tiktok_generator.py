@@ -3,22 +3,329 @@
 TikTok Reel Generator - Genera contenido creativo para TikTok basado en análisis musical
 """
 
-import openai
+import functools
+import hashlib
 import json
+import orjson
 import os
-from typing import Dict, Any, List
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
+# Caracteres relevantes al delimitar un objeto JSON (el resto se salta de golpe)
+_JSON_TOKEN_RE = re.compile(r'[{}"\\]')
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Reintentos ante errores transitorios (429, 5xx, timeouts, conexión)
+MAX_REQUEST_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0  # segundos; se duplica en cada intento
+RETRY_MAX_DELAY = 30.0
+
+# Parámetros de generación de conceptos
+CONCEPT_TEMPERATURE = 0.7  # Creatividad moderada para mejor consistencia
+CONCEPT_MAX_TOKENS = 1500
+
+# Mensaje de sistema constante para la generación de conceptos
+_SYSTEM_PROMPT = """Eres un experto creador de contenido viral para TikTok.
+Tu trabajo es analizar música y crear conceptos de reels que sean:
+- Altamente virales y engaging
+- Creativos e innovadores
+- Perfectamente sincronizados con la música
+- Adaptados al algoritmo de TikTok
+
+IMPORTANTE: Responde ÚNICAMENTE en formato JSON válido, sin texto adicional.
+El JSON debe empezar con { y terminar con }."""
+
+# Prompt de usuario: las instrucciones y el formato JSON son constantes y van
+# primero (prefijo idéntico entre llamadas, cacheable por el proveedor); los
+# datos de la canción van al final.
+_PROMPT_TEMPLATE = """Crea un concepto viral para TikTok a partir de la música descrita al final.
+
+📱 GENERA UN CONCEPTO DE REEL EN ESTE FORMATO JSON:
+{{
+    "concept_title": "Título creativo del concepto",
+    "viral_hook": "Gancho viral en 3-5 segundos",
+    "story_structure": {{
+        "intro": "Qué mostrar en 0-3 segundos",
+        "hook_moment": "Momento de gancho en 3-6 segundos",
+        "development": "Desarrollo del contenido en 6-15 segundos",
+        "climax": "Momento más impactante en 15-20 segundos",
+        "closing": "Cierre y call-to-action en 20-30 segundos"
+    }},
+    "visual_elements": [
+        "Elemento visual 1",
+        "Elemento visual 2",
+        "Elemento visual 3"
+    ],
+    "transitions": [
+        "Transición 1 (timing específico)",
+        "Transición 2 (timing específico)",
+        "Transición 3 (timing específico)"
+    ],
+    "effects": [
+        "Efecto 1 (cuándo aplicarlo)",
+        "Efecto 2 (cuándo aplicarlo)"
+    ],
+    "hashtags": [
+        "hashtag1",
+        "hashtag2",
+        "hashtag3",
+        "hashtag4",
+        "hashtag5"
+    ],
+    "target_audience": "Audiencia objetivo específica",
+    "viral_potential": "Por qué será viral",
+    "music_sync_tips": [
+        "Consejo 1 para sincronizar con la música",
+        "Consejo 2 para sincronizar con la música"
+    ]
+}}
+
+IMPORTANTE:
+- El reel debe ser de máximo 30 segundos
+- Debe ser súper viral y engaging
+- Debe sincronizarse perfectamente con el beat
+- Usa la letra y emociones de la música
+- Sé creativo e innovador
+
+Analiza esta música:
+
+🎵 LETRA TRANSCRITA:
+"{transcription}..."
+
+😊 SENTIMIENTO: {sentiment}
+🎭 EMOCIONES: {emotions}
+🎨 TEMAS: {themes}
+🥁 TEMPO: {tempo} BPM
+⏱️ DURACIÓN: {duration} segundos
+"""
+
+# Directrices de estilo para que cada concepto de una tanda sea distinto
+VARIATION_STYLES = [
+    "Cinematográfico y emotivo, con planos lentos en los momentos clave",
+    "Tendencia y humor, con un giro inesperado",
+    "Estética minimalista, centrada en la letra",
+    "Storytelling en primera persona",
+    "Alta energía, baile y cortes rápidos al ritmo del beat",
+    "Misterio y revelación final",
+]
+
+# Esquema JSON del concepto (el mismo formato que pide _PROMPT_TEMPLATE). Con
+# salida estructurada el proveedor garantiza un JSON válido con estas claves.
+_STRING = {"type": "string"}
+_STRING_LIST = {"type": "array", "items": _STRING}
+TIKTOK_CONCEPT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "concept_title": _STRING,
+        "viral_hook": _STRING,
+        "story_structure": {
+            "type": "object",
+            "properties": {
+                "intro": _STRING,
+                "hook_moment": _STRING,
+                "development": _STRING,
+                "climax": _STRING,
+                "closing": _STRING
+            },
+            "required": ["intro", "hook_moment", "development", "climax", "closing"],
+            "additionalProperties": False
+        },
+        "visual_elements": _STRING_LIST,
+        "transitions": _STRING_LIST,
+        "effects": _STRING_LIST,
+        "hashtags": _STRING_LIST,
+        "target_audience": _STRING,
+        "viral_potential": _STRING,
+        "music_sync_tips": _STRING_LIST
+    },
+    "required": [
+        "concept_title", "viral_hook", "story_structure", "visual_elements", "transitions",
+        "effects", "hashtags", "target_audience", "viral_potential", "music_sync_tips"
+    ],
+    "additionalProperties": False
+}
+
+CONCEPT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "tiktok_concept", "strict": True, "schema": TIKTOK_CONCEPT_SCHEMA}
+}
+
+# Caché en disco de conceptos generados (clave: hash del modelo y los mensajes)
+DEFAULT_CONCEPT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "reelsense", "concepts")
+
+# Máximo de peticiones simultáneas a OpenRouter al generar varios conceptos
+MAX_CONCURRENT_REQUESTS = 8
+
+@functools.lru_cache(maxsize=None)
+def _retryable_errors() -> Tuple[type, ...]:
+    """
+    Errores transitorios de la API que merecen reintento (429, 5xx, timeouts,
+    conexión). openai se importa aquí para no pagar su carga al importar el módulo.
+    """
+    import openai
+    return (
+        openai.RateLimitError,
+        openai.APIConnectionError,  # incluye APITimeoutError
+        openai.InternalServerError,
+    )
+
+
+def _is_response_format_error(error: Exception) -> bool:
+    """
+    Indica si un error 400 de la API se debe a response_format (el modelo o el
+    proveedor no admiten salida estructurada).
+    
+    Args:
+        error: Error devuelto por la API
+        
+    Returns:
+        True si el error se refiere a response_format o al esquema JSON
+    """
+    if getattr(error, "param", None) == "response_format":
+        return True
+    text = f"{error} {getattr(error, 'body', '')}".lower()
+    return any(word in text for word in ("response_format", "json_schema", "structured output"))
+
+
+@functools.lru_cache(maxsize=8)
+def _get_client(api_key: str):
+    """
+    Obtiene un cliente de OpenRouter compartido por API key.
+    
+    Todas las instancias del generador reutilizan el mismo pool de conexiones
+    HTTP (keep-alive), así que solo la primera petición paga el handshake TLS.
+    
+    Args:
+        api_key: API key de OpenRouter
+        
+    Returns:
+        Cliente OpenAI configurado para OpenRouter
+    """
+    import openai
+    return openai.OpenAI(
+        base_url=OPENROUTER_BASE_URL,
+        api_key=api_key,
+        max_retries=0,  # Los reintentos los gestiona _create_completion
+    )
+
+
+def _summarize(music_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extrae del análisis musical el resumen que acompaña a cada concepto.
+    
+    Args:
+        music_analysis: Resultado del análisis musical
+        
+    Returns:
+        Diccionario con duración, tempo, sentimiento y emociones
+    """
+    sentiment = music_analysis.get('sentiment_analysis', {})
+    audio_info = music_analysis.get('audio_info', {})
+    return {
+        'duration': audio_info.get('duration_seconds', 0),
+        'tempo': audio_info.get('tempo_bpm', 0),
+        'sentiment': sentiment.get('sentiment', 'Unknown'),
+        'emotions': sentiment.get('emotions', {})
+    }
+
+
+class _JsonSpanScanner:
+    """
+    Localiza de forma incremental el primer objeto JSON completo de un texto.
+    
+    Cuenta la profundidad de llaves ignorando las que aparecen dentro de
+    cadenas (respetando escapes), así que el texto que el modelo añada después
+    del objeto no se incluye. Permite ir alimentando la respuesta por trozos
+    (streaming) sin volver a recorrer lo ya visto.
+    """
+    
+    def __init__(self):
+        self.text = ""
+        self.start = -1
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+    
+    def feed(self, chunk: str) -> Optional[Tuple[int, int]]:
+        """
+        Agrega texto y continúa la búsqueda.
+        
+        Args:
+            chunk: Nuevo fragmento de texto
+            
+        Returns:
+            Tupla (inicio, fin) para self.text[inicio:fin] en cuanto el objeto
+            se cierra, o None si todavía no está completo
+        """
+        self.text += chunk
+        text = self.text
+        
+        if self.start == -1:
+            self.start = text.find('{', self.pos)
+            if self.start == -1:
+                self.pos = len(text)
+                return None
+            self.pos = self.start
+        
+        while True:
+            match = _JSON_TOKEN_RE.search(text, self.pos)
+            if match is None:
+                return None
+            char = match.group()
+            self.pos = match.end()
+            
+            if self.in_string:
+                if char == '\\':
+                    self.pos += 1  # Saltar el carácter escapado
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                self.depth += 1
+            elif char == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    return self.start, self.pos
+
+
+def _find_json_span(text: str) -> Optional[Tuple[int, int]]:
+    """
+    Localiza el primer objeto JSON completo de un texto en una sola pasada.
+    
+    Args:
+        text: Texto con el JSON
+        
+    Returns:
+        Tupla (inicio, fin) para text[inicio:fin], o None si no hay objeto cerrado
+    """
+    return _JsonSpanScanner().feed(text)
+
+
 class TikTokReelGenerator:
-    def __init__(self, api_key: str = None, model: str = "openai/gpt-oss-20b:free"):
+    def __init__(self, api_key: str = None, model: str = "openai/gpt-oss-20b:free",
+                 use_cache: bool = True, cache_dir: Optional[str] = None):
         """
         Inicializa el generador de reels de TikTok.
         
         Args:
             api_key: API key de OpenRouter (opcional, busca en variables de entorno)
             model: Modelo de IA a usar
+            use_cache: Reutilizar conceptos ya generados para el mismo prompt
+            cache_dir: Directorio de la caché (por defecto ~/.cache/reelsense/concepts)
         """
         self.model = model
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir or DEFAULT_CONCEPT_CACHE_DIR
+        # Pedir salida estructurada (JSON Schema); se desactiva sola si el
+        # modelo o el proveedor no la admiten
+        self.structured_output = True
         self.api_key = api_key or os.getenv('OPENROUTER_API_KEY')
         
         if not self.api_key:
@@ -27,90 +334,280 @@ class TikTokReelGenerator:
                 "o pásala como parámetro."
             )
         
-        # Configurar cliente OpenAI para OpenRouter
-        self.client = openai.OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=self.api_key,
-        )
+        # Cliente OpenAI para OpenRouter (compartido entre instancias)
+        self.client = _get_client(self.api_key)
         
         print(f"🎬 Generador de TikTok Reels inicializado con modelo: {model}")
     
-    def generate_reel_concept(self, music_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_reel_concept(self, music_analysis: Dict[str, Any],
+                              style: Optional[str] = None) -> Dict[str, Any]:
         """
         Genera un concepto completo para un reel de TikTok basado en análisis musical.
         
         Args:
             music_analysis: Resultado del análisis musical
+            style: Directriz de estilo opcional (ver VARIATION_STYLES)
+            
+        Returns:
+            Diccionario con el concepto del reel
+        """
+        return self._generate_reel_concept_with_summary(
+            self._create_base_prompt(music_analysis), _summarize(music_analysis), style
+        )
+    
+    def _generate_reel_concept_with_summary(self, base_prompt: str, summary: Dict[str, Any],
+                                            style: Optional[str] = None,
+                                            variation: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Genera un concepto a partir del prompt base y el resumen ya calculados
+        (generate_multiple_concepts los calcula una sola vez para todos los conceptos).
+        
+        Args:
+            base_prompt: Prompt de usuario sin directriz de estilo
+            summary: Resumen del análisis musical (ver _summarize)
+            style: Directriz de estilo opcional (ver VARIATION_STYLES)
+            variation: Número de variación dentro de una tanda (opcional)
             
         Returns:
             Diccionario con el concepto del reel
         """
         print("🎬 Generando concepto de reel para TikTok...")
         
+        messages = self._build_messages(base_prompt, style, variation)
+        cache_key = self._cache_key(messages) if self.use_cache else None
+        
+        try:
+            if cache_key is not None:
+                cached = self._read_cache(cache_key)
+                if cached is not None:
+                    print("♻️  Usando concepto en caché")
+                    return self._add_concept_metadata(cached, summary)
+            
+            # Llamar a OpenRouter en streaming: en cuanto el objeto JSON se
+            # cierra se corta la respuesta, sin esperar al texto que siga
+            stream = self._create_concept_completion(messages)
+            
+            scanner = _JsonSpanScanner()
+            try:
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta and scanner.feed(delta) is not None:
+                        break
+            finally:
+                stream.close()
+            
+            # Extraer respuesta
+            content = scanner.text.strip()
+            
+            return self._concept_from_content(content, summary, cache_key)
+            
+        except Exception as e:
+            print(f"❌ Error generando concepto: {str(e)}")
+            return self._generate_fallback_concept(summary)
+    
+    def _create_concept_completion(self, messages: List[Dict[str, str]]):
+        """
+        Pide un concepto en streaming, con salida estructurada si está disponible.
+        
+        Si la API rechaza response_format (un 400 que lo menciona), se desactiva
+        la salida estructurada para este generador y se repite la petición sin
+        ella; el JSON se extrae entonces de la respuesta libre. Cualquier otro
+        400 se propaga.
+        
+        Args:
+            messages: Mensajes del chat (ver _build_messages)
+            
+        Returns:
+            Stream de la respuesta
+        """
+        params = dict(
+            model=self.model,
+            messages=messages,
+            temperature=CONCEPT_TEMPERATURE,
+            max_tokens=CONCEPT_MAX_TOKENS,
+            stream=True
+        )
+        
+        if self.structured_output:
+            import openai
+            try:
+                return self._create_completion(response_format=CONCEPT_RESPONSE_FORMAT, **params)
+            except openai.BadRequestError as e:
+                # Otros 400 (contexto demasiado largo, modelo inválido...) no
+                # dicen nada de la salida estructurada: se propagan sin tocarla
+                if not _is_response_format_error(e):
+                    raise
+                self.structured_output = False
+                print(f"ℹ️ Salida estructurada no disponible ({str(e)}); usando JSON libre")
+        
+        return self._create_completion(**params)
+    
+    def _create_completion(self, **params):
+        """
+        Llama a la API de chat reintentando los errores transitorios con
+        backoff exponencial y jitter.
+        
+        Args:
+            params: Parámetros de chat.completions.create
+            
+        Returns:
+            Respuesta (o stream) de la API
+        """
+        retryable = _retryable_errors()
+        for attempt in range(1, MAX_REQUEST_ATTEMPTS + 1):
+            try:
+                return self.client.chat.completions.create(**params)
+            except retryable as e:
+                if attempt == MAX_REQUEST_ATTEMPTS:
+                    raise
+                delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+                delay += random.uniform(0, delay)
+                print(f"⚠️ Error transitorio ({type(e).__name__}), reintento "
+                      f"{attempt}/{MAX_REQUEST_ATTEMPTS - 1} en {delay:.1f}s...")
+                time.sleep(delay)
+    
+    def _create_base_prompt(self, music_analysis: Dict[str, Any]) -> str:
+        """
+        Crea el prompt de usuario (sin directriz de estilo) a partir del análisis.
+        
+        Args:
+            music_analysis: Resultado del análisis musical
+            
+        Returns:
+            Prompt de usuario
+        """
         # Extraer información clave del análisis
         transcription = music_analysis.get('transcription', '')
         sentiment = music_analysis.get('sentiment_analysis', {})
         audio_info = music_analysis.get('audio_info', {})
         
         # Crear prompt inteligente
-        prompt = self._create_tiktok_prompt(transcription, sentiment, audio_info)
+        return self._create_tiktok_prompt(transcription, sentiment, audio_info)
+    
+    def _build_messages(self, base_prompt: str, style: Optional[str] = None,
+                        variation: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Construye los mensajes del chat para generar un concepto.
         
-        try:
-            # Llamar a OpenRouter
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """Eres un experto creador de contenido viral para TikTok. 
-                        Tu trabajo es analizar música y crear conceptos de reels que sean:
-                        - Altamente virales y engaging
-                        - Creativos e innovadores
-                        - Perfectamente sincronizados con la música
-                        - Adaptados al algoritmo de TikTok
-                        
-                        IMPORTANTE: Responde ÚNICAMENTE en formato JSON válido, sin texto adicional.
-                        El JSON debe empezar con { y terminar con }."""
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.7,  # Creatividad moderada para mejor consistencia
-                max_tokens=1500
-            )
-            
-            # Extraer respuesta
-            content = response.choices[0].message.content.strip()
-            
-            # Limpiar la respuesta para extraer solo el JSON
-            content = self._extract_json_from_response(content)
+        Args:
+            base_prompt: Prompt de usuario (ver _create_base_prompt)
+            style: Directriz de estilo opcional (se añade al final del prompt)
+            variation: Número de variación dentro de una tanda (opcional); con
+                más conceptos que estilos, distingue los que repiten estilo (y
+                su clave de caché)
             
-            # Si no se pudo extraer JSON, usar fallback
-            if not content:
-                print("⚠️ Usando concepto de respaldo...")
-                return self._generate_fallback_concept(music_analysis)
+        Returns:
+            Lista de mensajes (sistema + usuario)
+        """
+        prompt = base_prompt
+        if style:
+            prompt += f"🎬 ESTILO DEL CONCEPTO: {style}\n"
+        if variation is not None:
+            prompt += f"🔢 VARIACIÓN #{variation}: propón una idea distinta de las demás variaciones\n"
+        
+        return [
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _concept_from_content(self, content: str, summary: Dict[str, Any],
+                              cache_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Convierte la respuesta del modelo en un concepto con metadatos.
+        
+        Args:
+            content: Texto de la respuesta del modelo
+            summary: Resumen del análisis musical (ver _summarize)
+            cache_key: Clave con la que guardar el concepto en caché (opcional)
             
-            # Parsear JSON
-            reel_concept = json.loads(content)
+        Returns:
+            Diccionario con el concepto del reel (o el de respaldo si no hay JSON válido)
+        """
+        # Extraer y parsear (una sola vez) el JSON de la respuesta
+        reel_concept = self._extract_json_from_response(content)
+        
+        # Si no se pudo extraer JSON, usar fallback
+        if reel_concept is None:
+            print("⚠️ Usando concepto de respaldo...")
+            return self._generate_fallback_concept(summary)
+        
+        if cache_key is not None:
+            self._write_cache(cache_key, reel_concept)
+        
+        print("✅ Concepto de reel generado exitosamente!")
+        return self._add_concept_metadata(reel_concept, summary)
+    
+    def _add_concept_metadata(self, reel_concept: Dict[str, Any],
+                              summary: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Agrega al concepto los metadatos de generación y el resumen musical.
+        
+        Args:
+            reel_concept: Concepto devuelto por el modelo
+            summary: Resumen del análisis musical (ver _summarize)
             
-            # Agregar metadatos
-            reel_concept['generated_at'] = datetime.now().isoformat()
-            reel_concept['model_used'] = self.model
-            reel_concept['music_analysis_summary'] = {
-                'duration': audio_info.get('duration_seconds', 0),
-                'tempo': audio_info.get('tempo_bpm', 0),
-                'sentiment': sentiment.get('sentiment', 'Unknown'),
-                'emotions': sentiment.get('emotions', {})
-            }
+        Returns:
+            El mismo concepto con los metadatos agregados
+        """
+        reel_concept['generated_at'] = datetime.now().isoformat()
+        reel_concept['model_used'] = self.model
+        reel_concept['music_analysis_summary'] = dict(summary)
+        
+        return reel_concept
+    
+    def _cache_key(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Calcula la clave de caché de una petición.
+        
+        Args:
+            messages: Mensajes del chat
             
-            print("✅ Concepto de reel generado exitosamente!")
-            return reel_concept
+        Returns:
+            Hash de los parámetros que determinan la respuesta
+        """
+        payload = json.dumps({
+            "model": self.model,
+            "messages": messages,
+            "temperature": CONCEPT_TEMPERATURE,
+            "max_tokens": CONCEPT_MAX_TOKENS
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _read_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Lee un concepto de la caché.
+        
+        Args:
+            cache_key: Clave de caché
             
-        except Exception as e:
-            print(f"❌ Error generando concepto: {str(e)}")
-            return self._generate_fallback_concept(music_analysis)
+        Returns:
+            Concepto cacheado o None
+        """
+        try:
+            with open(os.path.join(self.cache_dir, f"{cache_key}.json"), 'rb') as f:
+                return orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+    
+    def _write_cache(self, cache_key: str, reel_concept: Dict[str, Any]) -> None:
+        """
+        Guarda un concepto en la caché (escritura atómica; los fallos no son fatales).
+        
+        Args:
+            cache_key: Clave de caché
+            reel_concept: Concepto devuelto por el modelo (sin metadatos)
+        """
+        cache_path = os.path.join(self.cache_dir, f"{cache_key}.json")
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(reel_concept))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el concepto en caché: {e}")
     
     def _create_tiktok_prompt(self, transcription: str, sentiment: Dict, audio_info: Dict) -> str:
         """
@@ -118,108 +615,58 @@ class TikTokReelGenerator:
         """
         emotions = sentiment.get('emotions', {})
         themes = sentiment.get('themes', {})
-        tempo = audio_info.get('tempo_bpm', 0)
-        duration = audio_info.get('duration_seconds', 0)
-        
-        prompt = f"""
-        Analiza esta música y crea un concepto viral para TikTok:
-
-        🎵 LETRA TRANSCRITA:
-        "{transcription[:200]}..."
-
-        😊 SENTIMIENTO: {sentiment.get('sentiment', 'Unknown')}
-        🎭 EMOCIONES: {', '.join([f'{k}: {v}' for k, v in emotions.items()])}
-        🎨 TEMAS: {', '.join([f'{k}: {v}' for k, v in themes.items()])}
-        🥁 TEMPO: {tempo} BPM
-        ⏱️ DURACIÓN: {duration} segundos
-
-        📱 GENERA UN CONCEPTO DE REEL EN ESTE FORMATO JSON:
-        {{
-            "concept_title": "Título creativo del concepto",
-            "viral_hook": "Gancho viral en 3-5 segundos",
-            "story_structure": {{
-                "intro": "Qué mostrar en 0-3 segundos",
-                "hook_moment": "Momento de gancho en 3-6 segundos",
-                "development": "Desarrollo del contenido en 6-15 segundos",
-                "climax": "Momento más impactante en 15-20 segundos",
-                "closing": "Cierre y call-to-action en 20-30 segundos"
-            }},
-            "visual_elements": [
-                "Elemento visual 1",
-                "Elemento visual 2",
-                "Elemento visual 3"
-            ],
-            "transitions": [
-                "Transición 1 (timing específico)",
-                "Transición 2 (timing específico)",
-                "Transición 3 (timing específico)"
-            ],
-            "effects": [
-                "Efecto 1 (cuándo aplicarlo)",
-                "Efecto 2 (cuándo aplicarlo)"
-            ],
-            "hashtags": [
-                "hashtag1",
-                "hashtag2",
-                "hashtag3",
-                "hashtag4",
-                "hashtag5"
-            ],
-            "target_audience": "Audiencia objetivo específica",
-            "viral_potential": "Por qué será viral",
-            "music_sync_tips": [
-                "Consejo 1 para sincronizar con la música",
-                "Consejo 2 para sincronizar con la música"
-            ]
-        }}
-
-        IMPORTANTE: 
-        - El reel debe ser de máximo 30 segundos
-        - Debe ser súper viral y engaging
-        - Debe sincronizarse perfectamente con el beat
-        - Usa la letra y emociones de la música
-        - Sé creativo e innovador
-        """
+        # Sin decimales de más: cada dígito son tokens de entrada que se pagan
+        tempo = int(round(audio_info.get('tempo_bpm', 0)))
+        duration = round(audio_info.get('duration_seconds', 0), 1)
+        
+        # Cortar la letra en un límite de palabra (sin medias palabras al final)
+        if len(transcription) > 200:
+            transcription = transcription[:200].rsplit(' ', 1)[0]
+        
+        prompt = _PROMPT_TEMPLATE.format_map({
+            'transcription': transcription,
+            'sentiment': sentiment.get('sentiment', 'Unknown'),
+            'emotions': ', '.join([f'{k}: {v}' for k, v in emotions.items() if v]),
+            'themes': ', '.join([f'{k}: {v}' for k, v in themes.items() if v]),
+            'tempo': tempo,
+            'duration': duration
+        })
         
         return prompt
     
-    def _extract_json_from_response(self, content: str) -> str:
+    def _extract_json_from_response(self, content: str) -> Optional[Dict[str, Any]]:
         """
-        Extrae el JSON válido de la respuesta del modelo.
+        Extrae y parsea el JSON de la respuesta del modelo.
         
         Args:
             content: Respuesta completa del modelo
             
         Returns:
-            String con solo el JSON válido
+            Diccionario con el JSON parseado, o None si no hay un objeto JSON válido
         """
-        # Buscar el primer { y último }
-        start = content.find('{')
-        end = content.rfind('}')
+        span = _find_json_span(content)
         
-        if start != -1 and end != -1 and end > start:
-            json_content = content[start:end+1]
-            
-            # Verificar que sea JSON válido
+        if span is not None:
             try:
-                json.loads(json_content)
-                return json_content
-            except json.JSONDecodeError:
+                parsed = orjson.loads(content[span[0]:span[1]])
+                if isinstance(parsed, dict):
+                    return parsed
+            except orjson.JSONDecodeError:
                 pass
         
         # Si no se puede extraer JSON válido, generar uno básico
         print("⚠️ No se pudo extraer JSON válido de la respuesta del modelo")
-        return ""
+        return None
     
-    def _generate_fallback_concept(self, music_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_fallback_concept(self, summary: Dict[str, Any]) -> Dict[str, Any]:
         """
         Genera un concepto básico si falla la IA.
+        
+        Args:
+            summary: Resumen del análisis musical (ver _summarize)
         """
         print("⚠️ Generando concepto básico como respaldo...")
         
-        sentiment = music_analysis.get('sentiment_analysis', {})
-        emotions = sentiment.get('emotions', {})
-        
         return {
             "concept_title": "Reel Musical Automático",
             "viral_hook": "¡Descubre el poder de esta música!",
@@ -259,12 +706,7 @@ class TikTokReelGenerator:
             ],
             "generated_at": datetime.now().isoformat(),
             "model_used": "fallback",
-            "music_analysis_summary": {
-                "duration": music_analysis.get('audio_info', {}).get('duration_seconds', 0),
-                "tempo": music_analysis.get('audio_info', {}).get('tempo_bpm', 0),
-                "sentiment": sentiment.get('sentiment', 'Unknown'),
-                "emotions": emotions
-            }
+            "music_analysis_summary": dict(summary)
         }
     
     def generate_multiple_concepts(self, music_analysis: Dict[str, Any], count: int = 3) -> List[Dict[str, Any]]:
@@ -280,18 +722,27 @@ class TikTokReelGenerator:
         """
         print(f"🎬 Generando {count} conceptos diferentes de reels...")
         
-        concepts = []
-        for i in range(count):
+        if count <= 0:
+            return []
+        
+        # Prompt base y resumen son iguales para todos los conceptos: una sola vez
+        base_prompt = self._create_base_prompt(music_analysis)
+        summary = _summarize(music_analysis)
+        
+        def generate(i: int) -> Dict[str, Any]:
             print(f"   Generando concepto {i+1}/{count}...")
             
-            # Modificar ligeramente el prompt para variación
-            concept = self.generate_reel_concept(music_analysis)
+            # Una directriz de estilo distinta por concepto para obtener variación
+            style = VARIATION_STYLES[i % len(VARIATION_STYLES)]
+            concept = self._generate_reel_concept_with_summary(base_prompt, summary, style, i + 1)
             concept['concept_number'] = i + 1
-            concept['variation_style'] = f"Estilo {i+1}"
-            
-            concepts.append(concept)
+            concept['variation_style'] = style
+            return concept
         
-        return concepts
+        # Las peticiones son independientes y limitadas por la red: lanzarlas en
+        # paralelo (map conserva el orden de los conceptos)
+        with ThreadPoolExecutor(max_workers=min(count, MAX_CONCURRENT_REQUESTS)) as executor:
+            return list(executor.map(generate, range(count)))
     
     def save_concepts(self, concepts: List[Dict[str, Any]], output_path: str = None) -> str:
         """
@@ -311,9 +762,9 @@ class TikTokReelGenerator:
         # Crear directorio si no existe
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # Guardar conceptos
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(concepts, f, ensure_ascii=False, indent=2)
+        # Guardar conceptos (serializado de una vez con orjson; UTF-8 sin escapar)
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(concepts, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
         
         print(f"💾 Conceptos guardados en: {output_path}")
         return output_path
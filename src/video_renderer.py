@@ -4,7 +4,8 @@ Video Renderer for TikTok-style reels.
 Generates a 9:16 MP4 video using the audio file and a TikTok concept JSON.
 """
 
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+import functools
 import os
 import math
 import json
@@ -15,9 +16,11 @@ import librosa
 
 # MoviePy layout in this environment
 from moviepy.video.VideoClip import VideoClip
-from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
-from moviepy.video.VideoClip import ColorClip, ImageClip
+from moviepy.video.VideoClip import ImageClip
 from moviepy.audio.io.AudioFileClip import AudioFileClip
+from moviepy.tools import compute_position
+
+from cache_utils import DEFAULT_CACHE_DIR, file_sha256
 
 # Pillow for text rendering
 from PIL import Image, ImageDraw, ImageFont
@@ -25,6 +28,17 @@ from PIL import Image, ImageDraw, ImageFont
 DEFAULT_SIZE = (1080, 1920)  # 9:16 portrait
 DEFAULT_FPS = 30
 
+# beat times are cached on disk by audio content; bump when the beat tracking changes
+BEATS_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "beats")
+BEATS_CACHE_VERSION = 1
+
+# encoder name -> (ffmpeg codec, preset, extra ffmpeg params)
+ENCODERS = {
+	"libx264": ("libx264", "medium", None),
+	"ultrafast": ("libx264", "ultrafast", ["-tune", "zerolatency", "-crf", "23"]),
+	"nvenc": ("h264_nvenc", "p1", ["-tune", "ll"]),
+}
+
 
 def _safe_text(text: str, max_len: int = 140) -> str:
 	if not text:
@@ -35,47 +49,82 @@ def _safe_text(text: str, max_len: int = 140) -> str:
 
 def _generate_dynamic_bg(size: Tuple[int, int], duration: float) -> VideoClip:
 	w, h = size
+	# time-invariant part of the wave, computed once per clip
+	base = (2 * math.pi * np.add.outer(np.linspace(0, 1, h) * 1.2, np.linspace(0, 1, w) * 1.5)).astype(np.float32)
+	v = np.empty_like(base)
+	chan = np.empty_like(base)
+	out = np.empty((h, w, 3), dtype=np.uint8)
+	# palette shift for more contrast: channel = clip(scale * v + offset, 0, 1)
+	palette = ((0.6, 0.25), (0.25, 0.05), (0.9, 0.25))
 	def make_frame(t: float):
-		x = np.linspace(0, 1, w)
-		y = np.linspace(0, 1, h)
-		gx, gy = np.meshgrid(x, y)
 		phase = 2 * math.pi * (t / max(0.01, duration))
-		v = 0.5 + 0.5 * np.sin(2 * math.pi * (gx * 1.5 + gy * 1.2) + phase)
-		# palette shift for more contrast
-		r = np.clip(0.6 * v + 0.25, 0, 1)
-		g = np.clip(0.25 * v + 0.05, 0, 1)
-		b = np.clip(0.9 * v + 0.25, 0, 1)
-		frame = np.stack([r, g, b], axis=2)
-		return (frame * 255).astype("uint8")
+		np.add(base, np.float32(phase), out=v)
+		np.sin(v, out=v)
+		np.multiply(v, np.float32(0.5), out=v)
+		np.add(v, np.float32(0.5), out=v)
+		for c, (scale, offset) in enumerate(palette):
+			np.multiply(v, np.float32(scale * 255), out=chan)
+			np.add(chan, np.float32(offset * 255), out=chan)
+			np.clip(chan, 0, 255, out=chan)
+			out[:, :, c] = chan
+		return out
 	return VideoClip(make_frame, duration=duration)
 
 
-def _beats_from_audio(audio_path: str, sr_target: int = 22050) -> List[float]:
-	y, sr = librosa.load(audio_path, sr=sr_target, mono=True)
+def _load_audio(audio_path: str, sr_target: int = 22050) -> Tuple[np.ndarray, int]:
+	return librosa.load(audio_path, sr=sr_target, mono=True)
+
+
+def _beats_from_audio(audio_path: str, sr_target: int = 22050, audio: Optional[Tuple[np.ndarray, int]] = None) -> List[float]:
+	cache_path = os.path.join(BEATS_CACHE_DIR, f"{file_sha256(audio_path)}-sr{sr_target}-v{BEATS_CACHE_VERSION}.json")
+	try:
+		with open(cache_path, "r", encoding="utf-8") as f:
+			return json.load(f)
+	except (OSError, ValueError):
+		pass
+	y, sr = audio if audio is not None else _load_audio(audio_path, sr_target)
 	tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
-	return librosa.frames_to_time(beats, sr=sr).tolist()
+	times = librosa.frames_to_time(beats, sr=sr).tolist()
+	# atomic write; a failed write only costs the next render the analysis
+	tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+	try:
+		os.makedirs(BEATS_CACHE_DIR, exist_ok=True)
+		with open(tmp_path, "w", encoding="utf-8") as f:
+			json.dump(times, f)
+		os.replace(tmp_path, cache_path)
+	except OSError:
+		pass
+	return times
+
+
+def _frame_times(duration: float, fps: int) -> np.ndarray:
+	# the times MoviePy asks for when writing: frame k is rendered at t = k / fps
+	return np.arange(int(duration * fps) + 1) / fps
+
+
+def _frame_index(t: float, fps: int, nframes: int) -> int:
+	return min(max(int(round(t * fps)), 0), nframes - 1)
 
 
-def _pulse_overlay(size: Tuple[int, int], times: List[float], duration: float) -> VideoClip:
+def _pulse_overlay(size: Tuple[int, int], times: List[float], duration: float, fps: int = DEFAULT_FPS) -> VideoClip:
 	w, h = size
+	# grey level per video frame, looked up instead of scanning every beat each frame
+	tk = _frame_times(duration, fps)
+	pulse = np.zeros(len(tk))
+	for bt in times:
+		lo, hi = np.searchsorted(tk, [bt - 0.10, bt + 0.10])
+		dist = np.abs(tk[lo:hi + 1] - bt)
+		near = dist < 0.10
+		pulse[lo:hi + 1][near] = np.maximum(pulse[lo:hi + 1][near], 1.0 - (dist[near] / 0.10))
+	lut = ((pulse ** 2) * 0.35 * 255).astype(np.uint8)
 	def make_frame(t: float):
-		pulse = 0.0
-		for bt in times:
-			if abs(t - bt) < 0.10:
-				pulse = max(pulse, 1.0 - (abs(t - bt) / 0.10))
-		alpha = (pulse ** 2) * 0.35
-		img = np.zeros((h, w, 3), dtype=np.uint8)
-		val = int(alpha * 255)
-		img[:, :, :] = (val, val, val)
-		return img
+		val = lut[_frame_index(t, fps, len(lut))]
+		return np.broadcast_to(np.array([val, val, val], dtype=np.uint8), (h, w, 3))
 	return VideoClip(make_frame, duration=duration)
 
 
-def _render_text_image(text: str, box_size: Tuple[int, int], fontsize: int = 64, color: Tuple[int, int, int] = (255, 255, 255)) -> np.ndarray:
-	w, h = box_size
-	img = Image.new("RGBA", (w, h), (0, 0, 0, 0))
-	draw = ImageDraw.Draw(img)
-	font = None
+@functools.lru_cache(maxsize=16)
+def _load_font(fontsize: int) -> ImageFont.ImageFont:
 	for fpath in [
 		"C:/Windows/Fonts/arialbd.ttf",
 		"C:/Windows/Fonts/arial.ttf",
@@ -84,12 +133,118 @@ def _render_text_image(text: str, box_size: Tuple[int, int], fontsize: int = 64,
 	]:
 		if os.path.exists(fpath):
 			try:
-				font = ImageFont.truetype(fpath, fontsize)
-				break
+				return ImageFont.truetype(fpath, fontsize)
 			except Exception:
 				pass
-	if font is None:
-		font = ImageFont.load_default()
+	return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=4096)
+def _text_bbox(text: str, fontsize: int) -> Tuple[int, int, int, int]:
+	return _load_font(fontsize).getbbox(text)
+
+
+@functools.lru_cache(maxsize=1024)
+def _line_mask(text: str, fontsize: int) -> Tuple[np.ndarray, int, int]:
+	# coverage mask of one line, rasterized once and reused by every frame/overlay that shows it;
+	# returns (mask, ox, oy) where (ox, oy) is where the text origin sits inside the mask
+	left, top, right, bottom = _text_bbox(text, fontsize)
+	ox, oy = 2 - min(0, left), 2 - min(0, top)
+	img = Image.new("L", (ox + right + 2, oy + bottom + 2), 0)
+	ImageDraw.Draw(img).text((ox, oy), text, font=_load_font(fontsize), fill=255)
+	mask = np.asarray(img, dtype=np.int32)
+	mask.setflags(write=False)
+	# crop to the inked pixels so neighbouring lines' regions only overlap where glyphs do
+	rows, cols = np.nonzero(mask.any(axis=1))[0], np.nonzero(mask.any(axis=0))[0]
+	if not len(rows):
+		return mask[:0, :0], ox, oy
+	return mask[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1], ox - cols[0], oy - rows[0]
+
+
+def _div255(a: np.ndarray) -> np.ndarray:
+	a = a + 128
+	return ((a >> 8) + a) >> 8
+
+
+def _fill_mask(rgb: np.ndarray, alpha: np.ndarray, mask: np.ndarray, ink: Tuple[int, int, int, int]) -> None:
+	# same integer math as Pillow drawing `ink` through `mask` onto RGBA: colour channels
+	# take the ink outright over fully transparent pixels and blend by coverage elsewhere
+	weight = np.where(alpha > 0, mask, np.where(mask > 0, 255, 0))
+	for c in range(3):
+		rgb[:, :, c] = _div255(rgb[:, :, c] * (255 - weight) + ink[c] * weight)
+	alpha[:] = _div255(alpha * (255 - mask) + ink[3] * mask)
+
+
+def _outline_passes(rgb: np.ndarray, alpha: np.ndarray, mask: np.ndarray, x: int, y: int, color: Tuple[int, int, int]) -> None:
+	# draws `mask` with its top-left at (x, y), clipped to rgb/alpha:
+	# a 3x3 black outline (offsets of 2 px) then the coloured fill
+	h, w = alpha.shape
+	mh, mw = mask.shape
+	shifted = np.zeros_like(alpha)
+	def place(dx: int, dy: int) -> np.ndarray:
+		shifted.fill(0)
+		px, py = x + dx, y + dy
+		sx0, sy0 = max(0, -px), max(0, -py)
+		sx1, sy1 = min(mw, w - px), min(mh, h - py)
+		if sx0 < sx1 and sy0 < sy1:
+			shifted[py + sy0:py + sy1, px + sx0:px + sx1] = mask[sy0:sy1, sx0:sx1]
+		return shifted
+	# black outline; it only changes colour where something was already drawn
+	outline_rgb = rgb.any()
+	for dx in (-2, 0, 2):
+		for dy in (-2, 0, 2):
+			m = place(dx, dy)
+			if outline_rgb:
+				_fill_mask(rgb, alpha, m, (0, 0, 0, 220))
+			else:
+				alpha[:] = _div255(alpha * (255 - m) + 220 * m)
+	_fill_mask(rgb, alpha, place(0, 0), (color[0], color[1], color[2], 255))
+
+
+@functools.lru_cache(maxsize=1024)
+def _line_sprite(text: str, fontsize: int, color: Tuple[int, int, int]) -> Tuple[np.ndarray, np.ndarray]:
+	# outlined line drawn on an empty region, 2 px margin around the mask; every pass is
+	# per-pixel, so a crop of this equals drawing the line into a clipped empty region
+	mask, _, _ = _line_mask(text, fontsize)
+	mh, mw = mask.shape
+	rgb = np.zeros((mh + 4, mw + 4, 3), dtype=np.int32)
+	alpha = np.zeros((mh + 4, mw + 4), dtype=np.int32)
+	_outline_passes(rgb, alpha, mask, 2, 2, color)
+	rgb.setflags(write=False)
+	alpha.setflags(write=False)
+	return rgb, alpha
+
+
+def _draw_outlined_line(rgb: np.ndarray, alpha: np.ndarray, text: str, x: int, y: int, fontsize: int, color: Tuple[int, int, int]) -> None:
+	mask, ox, oy = _line_mask(text, fontsize)
+	mh, mw = mask.shape
+	if not mh:
+		return
+	h, w = alpha.shape
+	# region touched by the line and its outline, clipped to the box
+	sx, sy = x - ox - 2, y - oy - 2
+	rx0, ry0 = max(0, sx), max(0, sy)
+	rx1, ry1 = min(w, sx + mw + 4), min(h, sy + mh + 4)
+	if rx0 >= rx1 or ry0 >= ry1:
+		return
+	reg_rgb = rgb[ry0:ry1, rx0:rx1]
+	reg_alpha = alpha[ry0:ry1, rx0:rx1]
+	if not reg_alpha.any() and not reg_rgb.any():
+		# nothing drawn here yet (the usual case): copy the cached sprite
+		sprite_rgb, sprite_alpha = _line_sprite(text, fontsize, color)
+		reg_rgb[:] = sprite_rgb[ry0 - sy:ry1 - sy, rx0 - sx:rx1 - sx]
+		reg_alpha[:] = sprite_alpha[ry0 - sy:ry1 - sy, rx0 - sx:rx1 - sx]
+		return
+	_outline_passes(reg_rgb, reg_alpha, mask, sx + 2 - rx0, sy + 2 - ry0, color)
+
+
+# results are shared between callers (typewriter prefixes, repeated overlays), so they are read-only
+@functools.lru_cache(maxsize=256)
+def _render_text_image(text: str, box_size: Tuple[int, int], fontsize: int = 64, color: Tuple[int, int, int] = (255, 255, 255)) -> np.ndarray:
+	# lines are composited from cached glyph masks with numpy instead of ten Pillow draws per line
+	w, h = box_size
+	rgb = np.zeros((h, w, 3), dtype=np.int32)
+	alpha = np.zeros((h, w), dtype=np.int32)
 
 	text = _safe_text(text, 220)
 	lines = []
@@ -97,7 +252,7 @@ def _render_text_image(text: str, box_size: Tuple[int, int], fontsize: int = 64,
 	line = ""
 	for wtoken in words:
 		candidate = (line + " " + wtoken).strip()
-		bbox = draw.textbbox((0, 0), candidate, font=font)
+		bbox = _text_bbox(candidate, fontsize)
 		if bbox[2] <= w - 20:
 			line = candidate
 		else:
@@ -108,20 +263,19 @@ def _render_text_image(text: str, box_size: Tuple[int, int], fontsize: int = 64,
 		lines.append(line)
 	line_heights = []
 	for ln in lines:
-		bbox = draw.textbbox((0, 0), ln, font=font)
+		bbox = _text_bbox(ln, fontsize)
 		line_heights.append(bbox[3] - bbox[1])
 	total_h = sum(line_heights) + max(0, (len(lines) - 1)) * 8
 	y_cursor = (h - total_h) // 2
 	for ln, lh in zip(lines, line_heights):
-		bbox = draw.textbbox((0, 0), ln, font=font)
+		bbox = _text_bbox(ln, fontsize)
 		ln_w = bbox[2] - bbox[0]
 		x = (w - ln_w) // 2
-		for dx in (-2, 0, 2):
-			for dy in (-2, 0, 2):
-				draw.text((x + dx, y_cursor + dy), ln, font=font, fill=(0, 0, 0, 220))
-		draw.text((x, y_cursor), ln, font=font, fill=(color[0], color[1], color[2], 255))
+		_draw_outlined_line(rgb, alpha, ln, x, y_cursor, fontsize, color)
 		y_cursor += lh + 8
-	return np.array(img.convert("RGB"))
+	out = rgb.astype(np.uint8)
+	out.setflags(write=False)
+	return out
 
 
 def _image_text_clip(text: str, size: Tuple[int, int], start: float, end: float, fontsize: int) -> ImageClip:
@@ -133,14 +287,19 @@ def _image_text_clip(text: str, size: Tuple[int, int], start: float, end: float,
 def _typewriter_clip(text: str, size: Tuple[int, int], start: float, dur: float, fontsize: int = 72) -> VideoClip:
 	text = _safe_text(text, 160)
 	w, h = int(size[0] * 0.9), 280
+	x0 = (size[0] - w) // 2
+	y0 = int(size[1] * 0.18)
+	# only the text box changes between frames, and only when another character appears;
+	# each prefix is rendered once (cached)
+	canvas = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+	shown = 0
 	def make_frame_local(t: float):
+		nonlocal shown
 		progress = max(0.0, min(1.0, t / max(0.01, dur)))
 		n = max(1, int(len(text) * progress))
-		img = _render_text_image(text[:n], (w, h), fontsize=fontsize, color=(255, 240, 200))
-		canvas = np.zeros((size[1], size[0], 3), dtype=np.uint8)
-		x0 = (size[0] - w) // 2
-		y0 = int(size[1] * 0.18)
-		canvas[y0:y0+h, x0:x0+w] = img
+		if n != shown:
+			canvas[y0:y0+h, x0:x0+w] = _render_text_image(text[:n], (w, h), fontsize=fontsize, color=(255, 240, 200))
+			shown = n
 		return canvas
 	return VideoClip(make_frame_local, duration=dur).with_start(start)
 
@@ -160,25 +319,25 @@ def _segment_timeline(duration: float) -> Dict[str, Tuple[float, float]]:
 	}
 
 
-def _waveform_overlay(size: Tuple[int, int], audio_path: str, duration: float) -> VideoClip:
+def _waveform_overlay(size: Tuple[int, int], audio_path: str, duration: float, audio: Optional[Tuple[np.ndarray, int]] = None, fps: int = DEFAULT_FPS) -> VideoClip:
 	w, h = size
-	y, sr = librosa.load(audio_path, sr=22050, mono=True)
+	y, sr = audio if audio is not None else _load_audio(audio_path)
 	win = int(sr * 0.02)
 	env = np.abs(librosa.util.frame(y, frame_length=win, hop_length=win).mean(axis=0))
 	env = env / (env.max() + 1e-8)
+	bar_w = int(w * 0.9)
+	bar_h = 140
+	y0 = int(h * 0.78)
+	x0 = int(w * 0.05)
+	# filled bar width per video frame
+	idx = ((_frame_times(duration, fps) / max(0.01, duration)) * len(env)).astype(int)
+	filled_lut = (bar_w * env[np.clip(idx, 0, len(env) - 1)]).astype(int)
+	canvas = np.zeros((h, w, 3), dtype=np.uint8)
+	bar = canvas[y0:y0+bar_h, x0:x0+bar_w]
 	def make_frame(t: float):
-		idx = int((t / max(0.01, duration)) * len(env))
-		idx = np.clip(idx, 0, len(env) - 1)
-		bar_w = int(w * 0.9)
-		bar_h = 140
-		img = np.zeros((bar_h, bar_w, 3), dtype=np.uint8)
-		val = env[idx]
-		filled = int(bar_w * val)
-		img[:, :filled, :] = (200, 200, 255)
-		canvas = np.zeros((h, w, 3), dtype=np.uint8)
-		y0 = int(h * 0.78)
-		x0 = int(w * 0.05)
-		canvas[y0:y0+bar_h, x0:x0+bar_w] = img
+		filled = filled_lut[_frame_index(t, fps, len(filled_lut))]
+		bar[:, :filled] = (200, 200, 255)
+		bar[:, filled:] = 0
 		return canvas
 	return VideoClip(make_frame, duration=duration)
 
@@ -206,7 +365,60 @@ def _karaoke_clips(transcription: str, size: Tuple[int, int], duration: float) -
 	return clips
 
 
-def render_tiktok_reel(concept: Dict[str, Any], audio_path: str, output_path: str, size: Tuple[int, int] = DEFAULT_SIZE, fps: int = DEFAULT_FPS, wow: bool = False, transcription: str = "") -> str:
+def _paste_region(frame_size: Tuple[int, int], pos: Tuple[int, int], size: Tuple[int, int]):
+	# destination and source slices of a (w, h) frame placed at pos, clipped to the canvas
+	(fw, fh), (x, y), (w, h) = frame_size, (int(pos[0]), int(pos[1])), size
+	x0, y0 = max(0, x), max(0, y)
+	x1, y1 = min(w, x + fw), min(h, y + fh)
+	if x0 >= x1 or y0 >= y1:
+		return None
+	return (slice(y0, y1), slice(x0, x1)), (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+
+
+def _composite_layers(layers: List[VideoClip], size: Tuple[int, int], duration: float) -> VideoClip:
+	# every layer here is opaque (no mask), so compositing is a plain paste in z-order;
+	# CompositeVideoClip would alpha-blend each layer on a transparent canvas and compute a mask
+	w, h = size
+	covers = [
+		tuple(clip.size) == tuple(size) and tuple(compute_position(clip.size, size, clip.pos(0), clip.relative_pos)) == (0, 0)
+		for clip in layers
+	]
+	# static overlays (text images, hashtags) are cropped to the canvas once: per frame
+	# they are a single slice copy, with no MoviePy frame or position calls
+	baked = {}
+	for i, clip in enumerate(layers):
+		if isinstance(clip, ImageClip) and not covers[i]:
+			region = _paste_region(clip.size, compute_position(clip.size, size, clip.pos(0), clip.relative_pos), size)
+			baked[i] = None if region is None else (region[0], np.ascontiguousarray(clip.img[region[1]][..., :3]))
+	out = np.zeros((h, w, 3), dtype=np.uint8)
+	def make_frame(t: float):
+		playing = [i for i, clip in enumerate(layers) if clip.is_playing(t)]
+		# full-frame layers hide everything below them, so those are never rendered
+		first = 0
+		for j, i in enumerate(playing):
+			if covers[i]:
+				first = j
+		if not playing or not covers[playing[first]]:
+			out[:] = 0
+		for i in playing[first:]:
+			if i in baked:
+				if baked[i] is not None:
+					dst, img = baked[i]
+					out[dst] = img
+				continue
+			clip = layers[i]
+			ct = t - clip.start
+			frame = clip.get_frame(ct)
+			region = _paste_region(frame.shape[1::-1], compute_position(frame.shape[1::-1], size, clip.pos(ct), clip.relative_pos), size)
+			if region is not None:
+				out[region[0]] = frame[region[1]][..., :3]
+		return out
+	return VideoClip(make_frame, duration=duration)
+
+
+def render_tiktok_reel(concept: Dict[str, Any], audio_path: str, output_path: str, size: Tuple[int, int] = DEFAULT_SIZE, fps: int = DEFAULT_FPS, wow: bool = False, transcription: str = "", encoder: str = "libx264") -> str:
+	if encoder not in ENCODERS:
+		raise ValueError(f"Unknown encoder: {encoder}")
 	if not os.path.exists(audio_path):
 		raise FileNotFoundError(f"Audio not found: {audio_path}")
 	audio_clip = AudioFileClip(audio_path)
@@ -214,17 +426,23 @@ def render_tiktok_reel(concept: Dict[str, Any], audio_path: str, output_path: st
 	if not duration or duration <= 0:
 		duration = 30.0
 	bg = _generate_dynamic_bg(size, duration)
+	# decoded once and shared by the beat tracker and the waveform overlay;
+	# without the waveform the beats usually come from the cache and need no decode
+	audio = None
 	beats = []
 	try:
-		beats = _beats_from_audio(audio_path)
+		if wow:
+			audio = _load_audio(audio_path)
+		beats = _beats_from_audio(audio_path, audio=audio)
 	except Exception:
 		beats = []
-	pulse = _pulse_overlay(size, beats, duration) if beats else ColorClip(size, color=(0, 0, 0)).with_opacity(0)
 
 	story = concept.get("story_structure", {})
 	timeline = _segment_timeline(duration)
 
-	layers: List[VideoClip] = [bg, pulse]
+	layers: List[VideoClip] = [bg]
+	if beats:
+		layers.append(_pulse_overlay(size, beats, duration, fps=fps))
 	def add_text_at(text: str, start: float, end: float, fontsize: int = 68):
 		if not text:
 			return
@@ -251,12 +469,13 @@ def render_tiktok_reel(concept: Dict[str, Any], audio_path: str, output_path: st
 		layers.append(ImageClip(ht_img).with_position(("center", int(size[1]*0.92))).with_start(0).with_duration(duration))
 
 	if wow:
-		layers.append(_waveform_overlay(size, audio_path, duration))
+		layers.append(_waveform_overlay(size, audio_path, duration, audio=audio, fps=fps))
 		layers.extend(_karaoke_clips(transcription, size, duration))
 
-	video = CompositeVideoClip(layers, size=size).with_audio(audio_clip).with_duration(duration)
+	video = _composite_layers(layers, size, duration).with_audio(audio_clip)
 	os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
-	video.write_videofile(output_path, fps=fps, codec="libx264", preset="medium", audio_codec="aac", threads=4)
+	codec, preset, ffmpeg_params = ENCODERS[encoder]
+	video.write_videofile(output_path, fps=fps, codec=codec, preset=preset, ffmpeg_params=ffmpeg_params, audio_codec="aac", threads=os.cpu_count())
 	video.close()
 	audio_clip.close()
 	return output_path
@@ -269,6 +488,7 @@ def main():
 	parser.add_argument("concept_json", help="Path to concept JSON (either a concept dict or integrated results with tiktok_concepts)")
 	parser.add_argument("--output", "-o", default="outputs/reel.mp4", help="Output MP4 path")
 	parser.add_argument("--wow", action="store_true", help="Enable WOW pack: waveform + karaoke + beat sync + typewriter")
+	parser.add_argument("--encoder", choices=sorted(ENCODERS), default="libx264", help="libx264 (preset medium), ultrafast (fast libx264 for throwaway reels) or nvenc (NVIDIA GPU)")
 	args = parser.parse_args()
 
 	with open(args.concept_json, "r", encoding="utf-8") as f:
@@ -283,7 +503,7 @@ def main():
 		concept = concepts[0]
 		transcription = data.get("transcription", "")
 
-	out = render_tiktok_reel(concept, args.audio, args.output, wow=args.wow, transcription=transcription)
+	out = render_tiktok_reel(concept, args.audio, args.output, wow=args.wow, transcription=transcription, encoder=args.encoder)
 	print(f"✅ Reel generado: {out}")
 
 if __name__ == "__main__":
@@ -5,9 +5,14 @@ Video Renderer Enhanced - Genera reels TikTok con efectos WOW mejorados
 
 import os
 import json
+import functools
 import math
 import random
-from typing import Dict, Any, Tuple, List
+import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Tuple, List, Callable, Optional
+import numba
 import numpy as np
 
 # MoviePy imports
@@ -17,96 +22,216 @@ except ImportError:
     from moviepy.video.VideoClip import VideoClip, ColorClip, ImageClip
     from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
     from moviepy.audio.io.AudioFileClip import AudioFileClip
+from moviepy.config import FFMPEG_BINARY
 
 # PIL para texto personalizado
 from PIL import Image, ImageDraw, ImageFont
 
 DEFAULT_SIZE = (1080, 1920)  # 9:16 vertical
 DEFAULT_FPS = 30
+# Escala de las capas de efectos (beat, partículas, formas): se generan a
+# menor resolución y se amplían al componer; el fondo va a resolución completa
+OVERLAY_SCALE = 0.5
+
+# Kernels por píxel compilados con Numba: recorren la imagen una sola vez
+# escribiendo directamente en el frame, sin arrays intermedios. Cada clip
+# llama a su kernel al construirse (MoviePy pide el frame 0), así que la
+# compilación ocurre antes del bucle de escritura del vídeo.
+
+@numba.njit(parallel=True, fastmath=True, nogil=True, cache=True)
+def _epic_background_kernel(t, x, y, vortex_sin, vortex_cos, out):
+    # Todo en float32 (entradas y constantes): con enteros o float64 Numba
+    # promociona cada operación a float64
+    f32 = np.float32
+    h, w = vortex_sin.shape
+    t = f32(t)
+    one, half, zero, top = f32(1), f32(0.5), f32(0), f32(255)
+    two_pi, pi = f32(2 * np.pi), f32(np.pi)
+    sin_x = np.sin(x + t * f32(3))
+    cos_x3 = np.cos(x * f32(3) + t * f32(4))
+    # sin(fase + 6t) = sin(fase)·cos(6t) + cos(fase)·sin(6t): la parte que
+    # depende del píxel viene precalculada y no hay seno por píxel
+    cos_t6, sin_t6 = math.cos(t * f32(6)), math.sin(t * f32(6))
+    for i in numba.prange(h):
+        cos_y = math.cos(y[i] + t * f32(2.5))
+        sin_y2 = math.sin(y[i] * f32(2) + t * f32(3))
+        for j in range(w):
+            energy_wave = cos_y * sin_x[j] + sin_y2 * cos_x3[j]
+            vortex = vortex_sin[i, j] * cos_t6 + vortex_cos[i, j] * sin_t6
+            combined = (energy_wave + vortex) * half
+            r = (combined + one) * f32(150) + f32(50)
+            g = (math.sin(combined * two_pi + t * f32(2)) + one) * f32(180) + f32(20)
+            b = (math.cos(combined * pi + t * f32(3)) + one) * f32(120) + f32(80)
+            out[i, j, 0] = np.uint8(min(max(r, zero), top))
+            out[i, j, 1] = np.uint8(min(max(g, zero), top))
+            out[i, j, 2] = np.uint8(min(max(b, zero), top))
+
+@numba.njit(parallel=True, nogil=True, cache=True)
+def _beat_rings_kernel(beat_radius_sq, beat_color, wave_outer_sq, wave_inner_sq, wave_colors, out):
+    h, w = out.shape[0], out.shape[1]
+    center_x, center_y = w // 2, h // 2
+    for i in numba.prange(h):
+        dy = i - center_y
+        for j in range(w):
+            dx = j - center_x
+            d2 = dx * dx + dy * dy
+            # Mismo orden de pintado que antes: círculo y luego las ondas encima
+            r, g, b = 0, 0, 0
+            if d2 <= beat_radius_sq:
+                r, g, b = beat_color[0], beat_color[1], beat_color[2]
+            for k in range(wave_outer_sq.shape[0]):
+                if wave_inner_sq[k] < d2 <= wave_outer_sq[k]:
+                    r, g, b = wave_colors[k, 0], wave_colors[k, 1], wave_colors[k, 2]
+            out[i, j, 0] = r
+            out[i, j, 1] = g
+            out[i, j, 2] = b
+
+@numba.njit(parallel=True, nogil=True, cache=True)
+def _geometric_kernel(bounds, radius_sq, colors, out):
+    h, w = out.shape[0], out.shape[1]
+    center_x, center_y = w // 2, h // 2
+    out[:] = 0
+    # Las formas se pintan en orden; cada una sobrescribe a las anteriores
+    for k in range(bounds.shape[0]):
+        y0, y1 = max(0, bounds[k, 0]), min(h, bounds[k, 1])
+        x0, x1 = max(0, bounds[k, 2]), min(w, bounds[k, 3])
+        for y in numba.prange(y0, y1):
+            dy = y - center_y
+            for x in range(x0, x1):
+                dx = x - center_x
+                if dx * dx + dy * dy <= radius_sq[k]:
+                    out[y, x, 0] = colors[k, 0]
+                    out[y, x, 1] = colors[k, 1]
+                    out[y, x, 2] = colors[k, 2]
+
+@numba.njit(parallel=True, nogil=True, cache=True)
+def _composite_kernel(base, layers, alphas, rows, cols, out):
+    h, w = out.shape[0], out.shape[1]
+    for i in numba.prange(h):
+        out[i] = base[i]
+        # Capas en orden; rows/cols dan el píxel de origen (vecino más
+        # cercano, como Image.resize(NEAREST)) en las de menor resolución
+        for k in range(len(layers)):
+            layer = layers[k]
+            li = rows[k, i]
+            opaque = alphas[k] < 0
+            a = np.uint32(255 if opaque else alphas[k])
+            na = np.uint32(255) - a
+            for j in range(w):
+                lj = cols[k, j]
+                for c in range(3):
+                    src = np.uint32(layer[li, lj, c])
+                    if opaque:
+                        out[i, j, c] = src
+                    else:
+                        # Aritmética entera de Image.alpha_composite sobre un fondo opaco
+                        tmp = (src * a + np.uint32(out[i, j, c]) * na) * np.uint32(128) + np.uint32(0x80 << 7)
+                        out[i, j, c] = (((tmp >> 8) + tmp) >> 8) >> 7
+
+@numba.njit(nogil=True, cache=True)
+def _particles_step_kernel(x, y, vx, vy, life, colors, scale, out):
+    h, w = out.shape[0], out.shape[1]
+    out[:] = 0
+    dt = 0.016  # 60 FPS
+    # Secuencial: si dos partículas se solapan, la última en dibujarse gana
+    for p in range(x.shape[0]):
+        # Actualizar posición, gravedad y vida
+        x[p] += vx[p] * dt
+        y[p] += vy[p] * dt
+        vy[p] += 50 * scale * dt
+        life[p] -= dt
+        
+        # Dibujar si está viva y en pantalla
+        if not (life[p] > 0 and 0 <= x[p] < w and 0 <= y[p] < h):
+            continue
+        
+        # Tamaño basado en la vida; color con transparencia basada en la vida
+        size = int(10 * scale * life[p])
+        cx, cy = int(x[p]), int(y[p])
+        r = min(max(int(colors[p, 0] * life[p]), 0), 255)
+        g = min(max(int(colors[p, 1] * life[p]), 0), 255)
+        b = min(max(int(colors[p, 2] * life[p]), 0), 255)
+        for py in range(max(0, cy - size), min(h, cy + size + 1)):
+            dy = py - cy
+            for px in range(max(0, cx - size), min(w, cx + size + 1)):
+                dx = px - cx
+                if dx * dx + dy * dy <= size * size:
+                    out[py, px, 0] = r
+                    out[py, px, 1] = g
+                    out[py, px, 2] = b
 
 def create_epic_background(size: Tuple[int, int], duration: float) -> VideoClip:
     """Crea un fondo épico con ondas de energía y colores dramáticos"""
     w, h = size
     
+    # Coordenadas y distancias al centro: no dependen de t, se calculan una vez
+    x = np.linspace(0, 8*np.pi, w, dtype=np.float32)
+    y = np.linspace(0, 12*np.pi, h, dtype=np.float32)
+    center_x, center_y = w//2, h//2
+    dist = np.sqrt((np.arange(w) - center_x)**2 + (np.arange(h)[:, None] - center_y)**2)
+    vortex_falloff = np.exp(-dist / 200)
+    vortex_sin = (np.sin(dist / 50) * vortex_falloff).astype(np.float32)
+    vortex_cos = (np.cos(dist / 50) * vortex_falloff).astype(np.float32)
+    
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+    
     def make_frame(t):
-        # Crear patrones de energía más dramáticos
-        x = np.linspace(0, 8*np.pi, w)
-        y = np.linspace(0, 12*np.pi, h)
-        X, Y = np.meshgrid(x, y)
-        
-        # Ondas de energía que pulsan
-        energy_wave = np.sin(X + t * 3) * np.cos(Y + t * 2.5)
-        energy_wave += np.cos(X * 3 + t * 4) * np.sin(Y * 2 + t * 3)
-        
-        # Efecto de vórtice en el centro
-        center_x, center_y = w//2, h//2
-        dist = np.sqrt((np.arange(w) - center_x)**2 + (np.arange(h)[:, None] - center_y)**2)
-        vortex = np.sin(dist/50 + t*6) * np.exp(-dist/200)
-        
-        # Combinar efectos
-        combined = (energy_wave + vortex) / 2
-        
-        # Colores más dramáticos y contrastantes
-        # Rojo intenso para energía
-        r = np.clip((combined + 1) * 150 + 50, 0, 255)
-        # Verde eléctrico
-        g = np.clip((np.sin(combined * 2*np.pi + t*2) + 1) * 180 + 20, 0, 255)
-        # Azul profundo
-        b = np.clip((np.cos(combined * np.pi + t*3) + 1) * 120 + 80, 0, 255)
+        # Ondas de energía (separables en x e y), vórtice en el centro y
+        # colores dramáticos: rojo de energía, verde eléctrico, azul profundo
+        _epic_background_kernel(float(t), x, y, vortex_sin, vortex_cos, frame)
         
         # Añadir destellos aleatorios
         if random.random() < 0.1:  # 10% de probabilidad por frame
-            flash_mask = np.random.random((h, w)) < 0.01
-            r[flash_mask] = 255
-            g[flash_mask] = 255
-            b[flash_mask] = 255
+            # ~1% de los píxeles: se sortean sus índices en vez de una máscara de (h, w)
+            n_flashes = np.random.binomial(h * w, 0.01)
+            frame.reshape(-1, 3)[np.random.randint(0, h * w, n_flashes)] = 255
         
-        frame = np.stack([r, g, b], axis=2).astype(np.uint8)
         return frame
     
     return VideoClip(make_frame, duration=duration)
 
-def create_beat_sync_effects(size: Tuple[int, int], duration: float, audio_path: str) -> VideoClip:
-    """Crea efectos sincronizados con el beat de la música"""
+def create_beat_sync_effects(size: Tuple[int, int], duration: float, audio_path: str, scale: float = 1.0) -> VideoClip:
+    """Crea efectos sincronizados con el beat de la música (medidas en píxeles multiplicadas por scale)"""
     w, h = size
     
     # Simular análisis de beat (en una implementación real usaríamos librosa)
     beat_times = np.linspace(0, duration, int(duration * 2))  # 2 beats por segundo
     
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+    wave_outer_sq = np.empty(3, dtype=np.int64)
+    wave_inner_sq = np.empty(3, dtype=np.int64)
+    wave_colors = np.empty((3, 3), dtype=np.uint8)
+    
     def make_frame(t):
-        frame = np.zeros((h, w, 3), dtype=np.uint8)
-        
-        # Encontrar el beat más cercano
-        closest_beat = min(beat_times, key=lambda x: abs(x - t))
+        # Encontrar el beat más cercano (búsqueda binaria; en empate, el anterior)
+        i = int(np.searchsorted(beat_times, t))
+        if i == len(beat_times) or (i > 0 and t - beat_times[i - 1] <= beat_times[i] - t):
+            i -= 1
+        closest_beat = beat_times[i]
         beat_intensity = 1.0 / (1.0 + abs(t - closest_beat) * 10)
         
-        # Círculos de beat que pulsan
-        center_x, center_y = w//2, h//2
-        
-        # Círculo principal de beat
-        beat_radius = int(300 * beat_intensity)
-        y_indices, x_indices = np.ogrid[:h, :w]
-        beat_mask = (x_indices - center_x)**2 + (y_indices - center_y)**2 <= beat_radius**2
-        
-        # Color del beat (rojo intenso)
+        # Círculo principal de beat (rojo intenso)
+        beat_radius = int(300 * scale * beat_intensity)
         beat_color = int(255 * beat_intensity)
-        frame[beat_mask] = [beat_color, max(0, beat_color//4), 0]
         
         # Ondas de beat que se expanden
         for i in range(3):
-            wave_radius = int(400 + i*200 + 200*beat_intensity)
-            wave_mask = (x_indices - center_x)**2 + (y_indices - center_y)**2 <= wave_radius**2
-            wave_mask &= (x_indices - center_x)**2 + (y_indices - center_y)**2 > (wave_radius-50)**2
+            wave_radius = int((400 + i*200 + 200*beat_intensity) * scale)
+            wave_outer_sq[i] = wave_radius**2
+            wave_inner_sq[i] = (wave_radius - int(50 * scale))**2
             
             wave_intensity = beat_intensity * (1 - i*0.3)
             wave_color = int(255 * wave_intensity)
-            frame[wave_mask] = [wave_color//2, wave_color, wave_color//2]
+            wave_colors[i] = [wave_color//2, wave_color, wave_color//2]
+        
+        _beat_rings_kernel(beat_radius**2, np.array([beat_color, max(0, beat_color//4), 0], dtype=np.uint8),
+                           wave_outer_sq, wave_inner_sq, wave_colors, frame)
         
         # Líneas de energía que se mueven al ritmo
         for i in range(5):
-            line_y = int(h/2 + 300 * math.sin(t * 4 + i * math.pi/3))
+            line_y = int(h/2 + 300 * scale * math.sin(t * 4 + i * math.pi/3))
             if 0 <= line_y < h:
-                line_width = int(20 * beat_intensity)
+                line_width = int(20 * scale * beat_intensity)
                 start_y = max(0, line_y - line_width//2)
                 end_y = min(h, line_y + line_width//2)
                 frame[start_y:end_y, :] = [255, 255, 0]  # Línea amarilla brillante
@@ -115,58 +240,27 @@ def create_beat_sync_effects(size: Tuple[int, int], duration: float, audio_path:
     
     return VideoClip(make_frame, duration=duration).with_opacity(0.8)
 
-def create_particle_explosion(size: Tuple[int, int], duration: float) -> VideoClip:
-    """Crea sistema de partículas explosivas"""
+def create_particle_explosion(size: Tuple[int, int], duration: float, scale: float = 1.0) -> VideoClip:
+    """Crea sistema de partículas explosivas (medidas en píxeles multiplicadas por scale)"""
     w, h = size
     
-    # Generar partículas
+    # Generar partículas: un array por atributo (estructura de arrays)
     num_particles = 200
-    particles = []
-    
-    for _ in range(num_particles):
-        particle = {
-            'x': random.uniform(0, w),
-            'y': random.uniform(0, h),
-            'vx': random.uniform(-200, 200),
-            'vy': random.uniform(-200, 200),
-            'life': random.uniform(0.5, 2.0),
-            'color': [random.randint(200, 255), random.randint(100, 255), random.randint(0, 255)]
-        }
-        particles.append(particle)
+    x = np.random.uniform(0, w, num_particles)
+    y = np.random.uniform(0, h, num_particles)
+    vx = np.random.uniform(-200 * scale, 200 * scale, num_particles)
+    vy = np.random.uniform(-200 * scale, 200 * scale, num_particles)
+    life = np.random.uniform(0.5, 2.0, num_particles)
+    colors = np.column_stack([
+        np.random.randint(200, 256, num_particles),
+        np.random.randint(100, 256, num_particles),
+        np.random.randint(0, 256, num_particles),
+    ])
+    frame = np.empty((h, w, 3), dtype=np.uint8)
     
     def make_frame(t):
-        frame = np.zeros((h, w, 3), dtype=np.uint8)
-        
-        # Actualizar y dibujar partículas
-        for particle in particles:
-            # Actualizar posición
-            particle['x'] += particle['vx'] * 0.016  # 60 FPS
-            particle['y'] += particle['vy'] * 0.016
-            
-            # Gravedad
-            particle['vy'] += 50 * 0.016
-            
-            # Vida
-            particle['life'] -= 0.016
-            
-            # Dibujar si está vivo y en pantalla
-            if (particle['life'] > 0 and 
-                0 <= particle['x'] < w and 0 <= particle['y'] < h):
-                
-                # Tamaño basado en la vida
-                size = int(10 * particle['life'])
-                x, y = int(particle['x']), int(particle['y'])
-                
-                # Dibujar partícula
-                for dy in range(-size, size+1):
-                    for dx in range(-size, size+1):
-                        px, py = x + dx, y + dy
-                        if (0 <= px < w and 0 <= py < h and 
-                            dx*dx + dy*dy <= size*size):
-                            # Color con transparencia basada en la vida
-                            alpha = particle['life']
-                            frame[py, px] = [np.clip(int(c * alpha), 0, 255) for c in particle['color']]
-        
+        # Cada llamada avanza la simulación un paso y dibuja las partículas vivas
+        _particles_step_kernel(x, y, vx, vy, life, colors, scale, frame)
         return frame
     
     return VideoClip(make_frame, duration=duration).with_opacity(0.9)
@@ -178,9 +272,11 @@ def create_text_effects(size: Tuple[int, int], duration: float, concept: Dict[st
     # Extraer información del concepto
     title = concept.get('concept_title', 'TikTok Reel')
     hook = concept.get('viral_hook', '¡Mira esto!')
+    frame = np.empty((h, w, 3), dtype=np.uint8)
     
     def make_frame(t):
-        frame = np.zeros((h, w, 3), dtype=np.uint8)
+        # Se reutiliza el mismo frame: solo hay que borrarlo
+        frame.fill(0)
         
         # Título principal (0-30%)
         if t < duration * 0.3:
@@ -203,10 +299,7 @@ def create_text_effects(size: Tuple[int, int], duration: float, concept: Dict[st
                         if random.random() < 0.1:
                             y += random.randint(-5, 5)
                         
-                        # Dibujar "letra"
-                        frame[y:y+80, x:x+char_width-10] = [255, 255, 255]
-                        
-                        # Borde de color
+                        # Dibujar "letra" (el relleno rojo cubre el bloque entero)
                         frame[y:y+80, x:x+char_width-10] = [255, 0, 0]
             
             # Efecto de explosión al final
@@ -215,11 +308,14 @@ def create_text_effects(size: Tuple[int, int], duration: float, concept: Dict[st
                 explosion_radius = int(400 * explosion_progress)
                 
                 center_x, center_y = w//2, h//4 + 40
-                y_indices, x_indices = np.ogrid[:h, :w]
-                explosion_mask = (x_indices - center_x)**2 + (y_indices - center_y)**2 <= explosion_radius**2
-                
                 explosion_color = int(255 * (1 - explosion_progress))
-                frame[explosion_mask] = [explosion_color, explosion_color//2, 0]
+                
+                # Rasterizar el disco solo dentro de su caja, no en toda la imagen
+                x0, x1 = max(0, center_x - explosion_radius), min(w, center_x + explosion_radius + 1)
+                y0, y1 = max(0, center_y - explosion_radius), min(h, center_y + explosion_radius + 1)
+                y_indices, x_indices = np.ogrid[y0:y1, x0:x1]
+                explosion_mask = (x_indices - center_x)**2 + (y_indices - center_y)**2 <= explosion_radius**2
+                frame[y0:y1, x0:x1][explosion_mask] = [explosion_color, explosion_color//2, 0]
         
         # Hook viral (30%-60%)
         elif t < duration * 0.6:
@@ -267,19 +363,22 @@ def create_text_effects(size: Tuple[int, int], duration: float, concept: Dict[st
     
     return VideoClip(make_frame, duration=duration).with_opacity(0.9)
 
-def create_geometric_energy(size: Tuple[int, int], duration: float) -> VideoClip:
-    """Crea formas geométricas energéticas"""
+def create_geometric_energy(size: Tuple[int, int], duration: float, scale: float = 1.0) -> VideoClip:
+    """Crea formas geométricas energéticas (medidas en píxeles multiplicadas por scale)"""
     w, h = size
     
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+    bounds = np.empty((6, 4), dtype=np.int64)
+    radius_sq = np.empty(6, dtype=np.float64)
+    colors = np.empty((6, 3), dtype=np.uint8)
+    
     def make_frame(t):
-        frame = np.zeros((h, w, 3), dtype=np.uint8)
-        
         # Triángulos que rotan
         center_x, center_y = w//2, h//2
         
         for i in range(6):
             angle = t * 2 + i * math.pi / 3
-            size_triangle = 150 + 50 * math.sin(t * 3 + i)
+            size_triangle = (150 + 50 * math.sin(t * 3 + i)) * scale
             
             # Puntos del triángulo
             points = []
@@ -289,25 +388,153 @@ def create_geometric_energy(size: Tuple[int, int], duration: float) -> VideoClip
                 py = center_y + size_triangle * math.sin(point_angle)
                 points.append((int(px), int(py)))
             
-            # Dibujar triángulo (aproximación)
-            if len(points) == 3:
-                # Rellenar triángulo
-                for y in range(max(0, min(points[0][1], points[1][1], points[2][1])),
-                              min(h, max(points[0][1], points[1][1], points[2][1]))):
-                    for x in range(max(0, min(points[0][0], points[1][0], points[2][0])),
-                                  min(w, max(points[0][0], points[1][0], points[2][0]))):
-                        # Verificar si el punto está dentro del triángulo
-                        if (x - center_x)**2 + (y - center_y)**2 <= size_triangle**2:
-                            # Color basado en el tiempo y posición
-                            color_r = int(127 * (math.sin(t * 2 + i) + 1))
-                            color_g = int(127 * (math.cos(t * 3 + i) + 1))
-                            color_b = int(127 * (math.sin(t * 4 + i) + 1))
-                            frame[y, x] = [color_r, color_g, color_b]
+            # Triángulo (aproximación): los píxeles de su caja dentro del
+            # círculo que lo circunscribe, con color según tiempo y posición
+            bounds[i] = [min(p[1] for p in points), max(p[1] for p in points),
+                         min(p[0] for p in points), max(p[0] for p in points)]
+            radius_sq[i] = size_triangle**2
+            colors[i] = [int(127 * (math.sin(t * 2 + i) + 1)),
+                         int(127 * (math.cos(t * 3 + i) + 1)),
+                         int(127 * (math.sin(t * 4 + i) + 1))]
         
+        _geometric_kernel(bounds, radius_sq, colors, frame)
         return frame
     
     return VideoClip(make_frame, duration=duration).with_opacity(0.7)
 
+@functools.lru_cache(maxsize=1)
+def _layer_pool() -> ThreadPoolExecutor:
+    """Hilos compartidos para generar las capas de un frame a la vez."""
+    return ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
+def _concurrent_layers() -> Optional[bool]:
+    """
+    Indica si las capas de un frame pueden generarse en hilos a la vez.
+    
+    La capa de hilos de Numba por defecto (workqueue) no admite llamadas
+    concurrentes a kernels paralelos, pero solo se sabe cuál se usa después de
+    ejecutar un kernel paralelo en el proceso: hasta entonces devuelve None.
+    """
+    if (os.cpu_count() or 1) == 1:
+        return False
+    try:
+        return numba.threading_layer() != "workqueue"
+    except ValueError:
+        # Capa de hilos aún no inicializada
+        return None
+
+def composite_layers(clips: List[VideoClip], size: Tuple[int, int], duration: float) -> VideoClip:
+    """
+    Compone capas a pantalla completa en un único VideoClip opaco.
+    
+    Sustituye a CompositeVideoClip para este caso: la primera capa es el fondo
+    opaco y las demás tienen, como mucho, una opacidad constante (with_opacity).
+    Las capas de un frame se generan en paralelo y se mezclan en una sola
+    pasada con _composite_kernel (mismo resultado que Image.alpha_composite);
+    las generadas a menor resolución se amplían (vecino más cercano) a size.
+    Las capas tapadas por una capa opaca posterior a pantalla completa no se
+    llegan a generar. El vídeo se escribe en RGB, sin máscara.
+    """
+    w, h = size
+    # Empezar por la última capa opaca a pantalla completa: lo que hay debajo no se ve
+    first = max(i for i, clip in enumerate(clips)
+                if i == 0 or (clip.mask is None and tuple(clip.size) == (w, h)))
+    clips = clips[first:]
+    # Opacidad constante de cada capa (-1 = opaca), con el mismo redondeo que MoviePy
+    alphas = np.array([-1 if clip.mask is None else int((clip.mask.get_frame(0) * 255).astype(np.uint8).flat[0])
+                       for clip in clips[1:]], dtype=np.int64)
+    # Píxel de origen por fila y columna de cada capa
+    rows = np.array([(2 * np.arange(h) + 1) * clip.size[1] // (2 * h) for clip in clips[1:]], dtype=np.int64)
+    cols = np.array([(2 * np.arange(w) + 1) * clip.size[0] // (2 * w) for clip in clips[1:]], dtype=np.int64)
+    # Mientras no se conozca la capa de hilos de Numba, las capas se generan en serie
+    concurrent = _concurrent_layers()
+    out = np.empty((h, w, 3), dtype=np.uint8)
+    
+    def layer_frame(clip, t):
+        return np.ascontiguousarray(clip.get_frame(t), dtype=np.uint8)
+    
+    def make_frame(t):
+        nonlocal concurrent
+        if concurrent:
+            frames = list(_layer_pool().map(layer_frame, clips, [t] * len(clips)))
+        else:
+            frames = [layer_frame(clip, t) for clip in clips]
+        if len(frames) == 1:
+            # Solo queda la capa opaca: no hay nada que mezclar
+            np.copyto(out, frames[0])
+        else:
+            _composite_kernel(frames[0], tuple(frames[1:]), alphas, rows, cols, out)
+        if concurrent is None:
+            concurrent = _concurrent_layers()
+        return out
+    
+    return VideoClip(make_frame, duration=duration)
+
+# Clip que genera cada proceso de write_video_ffmpeg (construido en el proceso)
+_worker_clip = None
+
+def _init_frame_worker(clip_factory: Callable[[], VideoClip]) -> None:
+    global _worker_clip
+    # Cada proceso genera frames completos: un hilo de Numba por proceso
+    numba.set_num_threads(1)
+    _worker_clip = clip_factory()
+
+def _render_frame(t: float) -> bytes:
+    return np.ascontiguousarray(_worker_clip.get_frame(t), dtype=np.uint8).tobytes()
+
+def write_video_ffmpeg(clip: VideoClip, audio_path: str, output_path: str, fps: int = DEFAULT_FPS,
+                       workers: int = 1, clip_factory: Optional[Callable[[], VideoClip]] = None,
+                       output_size: Optional[Tuple[int, int]] = None) -> None:
+    """
+    Escribe el vídeo enviando los frames en crudo (rgb24) a ffmpeg por stdin.
+    
+    Sustituye a write_videofile: sin el bucle de frames de MoviePy ni el audio
+    temporal; ffmpeg toma el audio directamente del archivo original y lo
+    codifica a AAC junto con el vídeo H.264. Con output_size distinto del
+    tamaño del clip, ffmpeg escala el vídeo (bilineal) al codificar.
+    
+    Con workers > 1 y clip_factory (función de módulo, p. ej. un partial, que
+    construye un clip idéntico a clip) los frames se generan en varios
+    procesos y se envían en orden. Solo vale para clips sin estado entre
+    frames. Los procesos se lanzan con spawn: con fork, las capas de hilos de
+    Numba (TBB, OpenMP de GNU) pueden bloquear el proceso padre o el hijo.
+    """
+    w, h = clip.size
+    scale_filter = []
+    if output_size is not None and tuple(output_size) != (w, h):
+        scale_filter = ['-vf', f'scale={output_size[0]}:{output_size[1]}:flags=fast_bilinear']
+    cmd = [
+        FFMPEG_BINARY, '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{w}x{h}', '-r', str(fps), '-i', '-',
+        '-i', audio_path,
+        '-map', '0:v', '-map', '1:a',
+        *scale_filter,
+        '-c:v', 'libx264', '-preset', 'medium', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-shortest',
+        output_path,
+    ]
+    times = [i / fps for i in range(int(clip.duration * fps))]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    try:
+        if workers > 1 and clip_factory is not None:
+            # Por bloques de unos pocos frames por proceso: imap no espera a
+            # que se consuman los resultados y acumularía frames en memoria
+            block = workers * 4
+            with multiprocessing.get_context('spawn').Pool(workers, initializer=_init_frame_worker,
+                                                           initargs=(clip_factory,)) as pool:
+                for start in range(0, len(times), block):
+                    for frame in pool.imap(_render_frame, times[start:start + block]):
+                        proc.stdin.write(frame)
+        else:
+            for t in times:
+                frame = np.ascontiguousarray(clip.get_frame(t), dtype=np.uint8)
+                proc.stdin.write(frame.data)
+    finally:
+        proc.stdin.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise IOError(f"ffmpeg terminó con código {returncode} al escribir {output_path}")
+
 def render_epic_reel(concept: Dict[str, Any], audio_path: str, output_path: str) -> str:
     """Renderiza un reel épico con efectos WOW mejorados"""
     
@@ -325,40 +552,36 @@ def render_epic_reel(concept: Dict[str, Any], audio_path: str, output_path: str)
     # 1. Fondo épico
     background = create_epic_background(DEFAULT_SIZE, duration)
     
+    # Las capas de efectos son de baja frecuencia: se generan a escala reducida
+    overlay_size = (int(DEFAULT_SIZE[0] * OVERLAY_SCALE), int(DEFAULT_SIZE[1] * OVERLAY_SCALE))
+    
     # 2. Efectos sincronizados con beat
-    beat_effects = create_beat_sync_effects(DEFAULT_SIZE, duration, audio_path)
+    beat_effects = create_beat_sync_effects(overlay_size, duration, audio_path, scale=OVERLAY_SCALE)
     
     # 3. Sistema de partículas explosivas
-    particles = create_particle_explosion(DEFAULT_SIZE, duration)
+    particles = create_particle_explosion(overlay_size, duration, scale=OVERLAY_SCALE)
     
     # 4. Efectos de texto dramáticos
     text_effects = create_text_effects(DEFAULT_SIZE, duration, concept)
     
     # 5. Formas geométricas energéticas
-    geometric = create_geometric_energy(DEFAULT_SIZE, duration)
+    geometric = create_geometric_energy(overlay_size, duration, scale=OVERLAY_SCALE)
     
     print("🎭 Componiendo video épico...")
     
     # Componer todas las capas
     clips = [background, beat_effects, particles, text_effects, geometric]
     
-    final_video = CompositeVideoClip(clips, size=DEFAULT_SIZE)
-    final_video = final_video.with_audio(audio_clip).with_duration(duration)
+    final_video = composite_layers(clips, DEFAULT_SIZE, duration)
     
     # Asegurar que el directorio existe
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
     print("🔄 Renderizando video épico...")
     
-    # Renderizar
-    final_video.write_videofile(
-        output_path,
-        fps=DEFAULT_FPS,
-        codec='libx264',
-        audio_codec='aac',
-        temp_audiofile='temp-audio.m4a',
-        remove_temp=True
-    )
+    # Renderizar: frames directos a ffmpeg, que añade el audio original (en
+    # serie: las partículas avanzan un paso por frame y no se pueden repartir)
+    write_video_ffmpeg(final_video, audio_path, output_path)
     
     # Limpiar
     final_video.close()
@@ -7,6 +7,7 @@ import os
 import json
 import math
 import random
+import functools
 from typing import Dict, Any, Tuple, List
 import numpy as np
 
@@ -16,12 +17,14 @@ try:
 except ImportError:
     from moviepy.video.VideoClip import VideoClip
     from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
-    from moviepy.video.VideoClip import ColorClip, TextClip
+    from moviepy.video.VideoClip import ColorClip, ImageClip
     from moviepy.audio.io.AudioFileClip import AudioFileClip
 
 # Pillow para texto
 from PIL import Image, ImageDraw, ImageFont
 
+from video_renderer_enhanced import write_video_ffmpeg
+
 DEFAULT_SIZE = (1080, 1920)  # 9:16 vertical
 DEFAULT_FPS = 30
 
@@ -29,6 +32,13 @@ def create_gradient_background(size: Tuple[int, int], duration: float, colors: L
     """Crea un fondo degradado animado"""
     w, h = size
     
+    # Posición vertical de cada fila (no depende de t), colores y frame
+    # reutilizado; todo en float32
+    ratio = (np.arange(h, dtype=np.float32) / np.float32(h))[:, None]
+    color_table = np.array(colors, dtype=np.float32)
+    one = np.float32(1)
+    gradient = np.empty((h, w, 3), dtype=np.uint8)
+    
     def make_frame(t):
         # Crear gradiente que cambia con el tiempo
         progress = (t / duration) % 1.0
@@ -37,91 +47,114 @@ def create_gradient_background(size: Tuple[int, int], duration: float, colors: L
         color_idx = int(progress * len(colors))
         next_idx = (color_idx + 1) % len(colors)
         
-        color1 = np.array(colors[color_idx])
-        color2 = np.array(colors[next_idx])
+        color1 = color_table[color_idx]
+        color2 = color_table[next_idx]
         
         # Factor de interpolación
-        factor = (progress * len(colors)) % 1.0
+        factor = np.float32((progress * len(colors)) % 1.0)
         
-        # Crear gradiente vertical
-        gradient = np.zeros((h, w, 3), dtype=np.uint8)
-        for y in range(h):
-            ratio = y / h
-            # Mezclar colores basado en posición Y y tiempo
-            final_color = color1 * (1 - ratio) + color2 * ratio
-            final_color = final_color * (1 - factor) + color2 * factor
-            gradient[y, :] = np.clip(final_color, 0, 255)
+        # Crear gradiente vertical: un color por fila (h, 3), mezclado según
+        # la posición Y y el tiempo, y copiado a todo el ancho
+        final_color = color1 * (one - ratio) + color2 * ratio
+        final_color = final_color * (one - factor) + color2 * factor
+        gradient[:] = np.clip(final_color, 0, 255).astype(np.uint8)[:, None, :]
         
         return gradient
     
     return VideoClip(make_frame, duration=duration)
 
-def create_typewriter_effect(text: str, size: Tuple[int, int], start_time: float, typing_duration: float) -> List[VideoClip]:
+@functools.lru_cache(maxsize=16)
+def _load_font(fontsize: int) -> ImageFont.ImageFont:
+    """Carga Arial Bold (o una fuente equivalente) una sola vez por tamaño"""
+    for font_name in ["arialbd.ttf", "Arial Bold.ttf", "DejaVuSans-Bold.ttf"]:
+        try:
+            return ImageFont.truetype(font_name, fontsize)
+        except OSError:
+            pass
+    return ImageFont.load_default(fontsize)
+
+def create_typewriter_effect(text: str, size: Tuple[int, int], start_time: float, typing_duration: float) -> VideoClip:
     """Crea efecto de máquina de escribir"""
     if not text:
-        return []
+        return ColorClip(size, color=(0,0,0), duration=0)
     
     # Limpiar texto
     text = text[:100]  # Limitar longitud
     
-    clips = []
     chars_per_second = len(text) / typing_duration
     
-    for i in range(1, len(text) + 1):
-        partial_text = text[:i]
-        appear_time = start_time + (i - 1) / chars_per_second
-        
-        try:
-            # Usar TextClip simple
-            txt_clip = TextClip(
-                partial_text,
-                fontsize=60,
-                color='white',
-                font='Arial-Bold'
-            ).set_position('center').set_start(appear_time).set_duration(0.1)
-            
-            clips.append(txt_clip)
-        except:
-            # Fallback sin fuente específica
-            txt_clip = TextClip(
-                partial_text,
-                fontsize=60,
-                color='white'
-            ).set_position('center').set_start(appear_time).set_duration(0.1)
-            
-            clips.append(txt_clip)
-    
-    return clips
+    # Un solo clip del tamaño del texto completo: el color es blanco fijo y
+    # solo cambia la máscara, que se redibuja con Pillow cuando aparece un
+    # carácter nuevo (cada texto parcial queda centrado, como antes)
+    font = _load_font(60)
+    left, top, right, bottom = font.getbbox(text)
+    text_w, text_h = right - left, bottom - top
+    white = np.full((text_h, text_w, 3), 255, dtype=np.uint8)
+    mask = np.zeros((text_h, text_w))
+    shown = 0
+    
+    def make_mask(t):
+        nonlocal shown
+        n = min(len(text), int(t * chars_per_second) + 1)
+        if n != shown:
+            partial_text = text[:n]
+            offset = (text_w - int(font.getlength(partial_text))) // 2
+            img = Image.new('L', (text_w, text_h), 0)
+            ImageDraw.Draw(img).text((offset - left, -top), partial_text, font=font, fill=255)
+            mask[:] = np.asarray(img) / 255.0
+            shown = n
+        return mask
+    
+    mask_clip = VideoClip(make_mask, is_mask=True, duration=typing_duration)
+    txt_clip = VideoClip(lambda t: white, duration=typing_duration).with_mask(mask_clip)
+    
+    return txt_clip.with_position('center').with_start(start_time)
+
+def _render_text_rgba(text: str, fontsize: int, color: str) -> np.ndarray:
+    """Rasteriza el texto una sola vez con Pillow: array RGBA recortado al texto"""
+    font = _load_font(fontsize)
+    left, top, right, bottom = font.getbbox(text)
+    img = Image.new('RGBA', (max(1, right - left), max(1, bottom - top)), (0, 0, 0, 0))
+    ImageDraw.Draw(img).text((-left, -top), text, font=font, fill=color)
+    return np.asarray(img)
 
 def create_pulsing_text(text: str, size: Tuple[int, int], start_time: float, duration: float) -> VideoClip:
     """Crea texto que pulsa al ritmo"""
     if not text:
         return ColorClip(size, color=(0,0,0), duration=0)
     
-    def size_function(t):
+    # Texto rasterizado una vez; el pulso (escala de 1 a 1.3) se cuantiza en
+    # niveles y cada nivel se escala por vecino más cercano la primera vez que
+    # se pide, centrado en un lienzo fijo del tamaño máximo
+    rgba = _render_text_rgba(text[:80], 50, 'yellow')  # Limitar texto
+    text_h, text_w = rgba.shape[:2]
+    max_scale = 1.3
+    levels = 16
+    canvas_h, canvas_w = int(text_h * max_scale) + 1, int(text_w * max_scale) + 1
+    scaled_levels = {}
+    
+    def level_frames(t):
         # Pulso cada 0.5 segundos
-        pulse = 1 + 0.3 * abs(math.sin(t * 4 * math.pi))
-        return pulse
-    
-    try:
-        txt_clip = TextClip(
-            text[:80],  # Limitar texto
-            fontsize=50,
-            color='yellow',
-            font='Arial-Bold'
-        ).set_position('center').set_start(start_time).set_duration(duration)
-        
-        # Aplicar efecto de pulso
-        txt_clip = txt_clip.resize(size_function)
-        
-        return txt_clip
-    except:
-        # Fallback
-        return TextClip(
-            text[:80],
-            fontsize=50,
-            color='yellow'
-        ).set_position('center').set_start(start_time).set_duration(duration).resize(size_function)
+        pulse = abs(math.sin(t * 4 * math.pi))
+        level = int(round(pulse * (levels - 1)))
+        if level not in scaled_levels:
+            scale = 1 + (max_scale - 1) * level / (levels - 1)
+            scaled_w, scaled_h = max(1, int(text_w * scale)), max(1, int(text_h * scale))
+            rows = np.arange(scaled_h) * text_h // scaled_h
+            cols = np.arange(scaled_w) * text_w // scaled_w
+            scaled = rgba[rows[:, None], cols]
+            y0, x0 = (canvas_h - scaled_h) // 2, (canvas_w - scaled_w) // 2
+            rgb = np.zeros((canvas_h, canvas_w, 3), dtype=np.uint8)
+            mask = np.zeros((canvas_h, canvas_w))
+            rgb[y0:y0+scaled_h, x0:x0+scaled_w] = scaled[:, :, :3]
+            mask[y0:y0+scaled_h, x0:x0+scaled_w] = scaled[:, :, 3] / 255.0
+            scaled_levels[level] = (rgb, mask)
+        return scaled_levels[level]
+    
+    mask_clip = VideoClip(lambda t: level_frames(t)[1], is_mask=True, duration=duration)
+    txt_clip = VideoClip(lambda t: level_frames(t)[0], duration=duration).with_mask(mask_clip)
+    
+    return txt_clip.with_position('center').with_start(start_time)
 
 def create_sliding_text(text: str, size: Tuple[int, int], start_time: float, duration: float, direction: str = 'right') -> VideoClip:
     """Crea texto que se desliza"""
@@ -142,31 +175,23 @@ def create_sliding_text(text: str, size: Tuple[int, int], start_time: float, dur
             y = int(h - (h * 0.5) * progress)
             return ('center', y)
     
-    try:
-        txt_clip = TextClip(
-            text[:60],
-            fontsize=45,
-            color='cyan',
-            font='Arial-Bold'
-        ).set_start(start_time).set_duration(duration)
-        
-        txt_clip = txt_clip.set_position(pos_function)
-        
-        return txt_clip
-    except:
-        return TextClip(
-            text[:60],
-            fontsize=45,
-            color='cyan'
-        ).set_start(start_time).set_duration(duration).set_position(pos_function)
+    # Texto rasterizado una vez con Pillow: una imagen fija (con su alfa como
+    # máscara) que solo cambia de posición
+    rgba = _render_text_rgba(text[:60], 45, 'cyan')
+    txt_clip = ImageClip(rgba).with_start(start_time).with_duration(duration)
+    
+    return txt_clip.with_position(pos_function)
 
 def create_beat_visualization(size: Tuple[int, int], duration: float) -> VideoClip:
     """Crea visualización de beats simple"""
     w, h = size
     
+    # Frame reutilizado entre llamadas
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+    
     def make_frame(t):
         # Crear barras que pulsan
-        frame = np.zeros((h, w, 3), dtype=np.uint8)
+        frame.fill(0)
         
         # Simular beats cada 0.5 segundos
         beat_intensity = abs(math.sin(t * 4 * math.pi))
@@ -179,17 +204,8 @@ def create_beat_visualization(size: Tuple[int, int], duration: float) -> VideoCl
     
     return VideoClip(make_frame, duration=duration)
 
-def render_wow_reel(concept: Dict[str, Any], audio_path: str, output_path: str, transcription: str = "") -> str:
-    """Renderiza un reel con efectos WOW"""
-    
-    print("🎬 Iniciando renderizado WOW...")
-    
-    # Cargar audio
-    audio_clip = AudioFileClip(audio_path)
-    duration = audio_clip.duration
-    
-    print(f"📽️ Duración del audio: {duration:.2f}s")
-    
+def build_reel_clip(concept: Dict[str, Any], duration: float) -> VideoClip:
+    """Construye el clip final (sin audio) a partir de sus capas"""
     # Colores para el gradiente (más vibrantes)
     colors = [
         (139, 69, 19),   # Marrón
@@ -218,8 +234,8 @@ def render_wow_reel(concept: Dict[str, Any], audio_path: str, output_path: str,
     
     # 1. Título con efecto typewriter (primeros 20%)
     if title:
-        typewriter_clips = create_typewriter_effect(title, DEFAULT_SIZE, 0, segment_duration)
-        clips.extend(typewriter_clips)
+        typewriter_clip = create_typewriter_effect(title, DEFAULT_SIZE, 0, segment_duration)
+        clips.append(typewriter_clip)
     
     # 2. Hook pulsante (20%-40%)
     if hook:
@@ -243,26 +259,35 @@ def render_wow_reel(concept: Dict[str, Any], audio_path: str, output_path: str,
         hashtag_clip = create_sliding_text(hashtag_text, DEFAULT_SIZE, segment_duration * 4, segment_duration, 'bottom')
         clips.append(hashtag_clip)
     
-    print(f"🎭 Creados {len(clips)} clips de video")
-    
     # Componer video final
     final_video = CompositeVideoClip(clips, size=DEFAULT_SIZE)
-    final_video = final_video.set_audio(audio_clip).set_duration(duration)
+    return final_video.with_duration(duration)
+
+def render_wow_reel(concept: Dict[str, Any], audio_path: str, output_path: str, transcription: str = "") -> str:
+    """Renderiza un reel con efectos WOW"""
+    
+    print("🎬 Iniciando renderizado WOW...")
+    
+    # Cargar audio
+    audio_clip = AudioFileClip(audio_path)
+    duration = audio_clip.duration
+    
+    print(f"📽️ Duración del audio: {duration:.2f}s")
+    
+    final_video = build_reel_clip(concept, duration)
+    
+    print(f"🎭 Creados {len(final_video.clips)} clips de video")
     
     # Asegurar que el directorio existe
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
     print("🔄 Renderizando video...")
     
-    # Renderizar
-    final_video.write_videofile(
-        output_path,
-        fps=DEFAULT_FPS,
-        codec='libx264',
-        audio_codec='aac',
-        temp_audiofile='temp-audio.m4a',
-        remove_temp=True
-    )
+    # Renderizar: frames directos a ffmpeg, que añade el audio original; los
+    # frames no dependen de los anteriores y se generan en varios procesos,
+    # cada uno con su copia del clip
+    write_video_ffmpeg(final_video, audio_path, output_path, workers=os.cpu_count() or 1,
+                       clip_factory=functools.partial(build_reel_clip, concept, duration))
     
     # Limpiar
     final_video.close()
@@ -5,9 +5,11 @@ Video Renderer Simple - Genera reels TikTok con efectos procedurales sin TextCli
 
 import os
 import json
+import functools
 import math
 import random
 from typing import Dict, Any, Tuple, List
+import numba
 import numpy as np
 
 # MoviePy imports
@@ -19,286 +21,350 @@ except ImportError:
     from moviepy.video.VideoClip import ColorClip
     from moviepy.audio.io.AudioFileClip import AudioFileClip
 
+from video_renderer_enhanced import composite_layers, write_video_ffmpeg
+
 DEFAULT_SIZE = (1080, 1920)  # 9:16 vertical
 DEFAULT_FPS = 30
+# Los efectos son de baja frecuencia (ondas, círculos, rectángulos): el reel se
+# genera a escala reducida y ffmpeg lo amplía a DEFAULT_SIZE al codificar
+RENDER_SCALE = 0.5
+RENDER_SIZE = (int(DEFAULT_SIZE[0] * RENDER_SCALE), int(DEFAULT_SIZE[1] * RENDER_SCALE))
+
+# Máscaras circulares de las partículas (tamaños de 3 a 8), calculadas una vez:
+# DISK_MASKS[s] tiene el disco de radio s centrado en una rejilla común 17x17
+MAX_PARTICLE_SIZE = 8
+_disk_offsets = np.arange(-MAX_PARTICLE_SIZE, MAX_PARTICLE_SIZE + 1)
+DISK_MASKS = np.stack([_disk_offsets[None, :]**2 + _disk_offsets[:, None]**2 <= s*s
+                       for s in range(MAX_PARTICLE_SIZE + 1)])
+
+@numba.njit(parallel=True, fastmath=True, cache=True)
+def _dynamic_background_kernel(t, x, y, ring_sin, ring_cos, out):
+    # Un solo recorrido por píxel escribiendo en el frame: las ondas son
+    # separables en x e y, así que sus senos se calculan por columna y por fila.
+    # Todo en float32 (entradas y constantes): con enteros o float64 Numba
+    # promociona cada operación a float64
+    f32 = np.float32
+    h, w = ring_sin.shape
+    t = f32(t)
+    one, half, zero, top = f32(1), f32(0.5), f32(0), f32(255)
+    pi = f32(np.pi)
+    sin_x = np.sin(x + t * f32(2))
+    cos_x2 = np.cos(x * f32(2) + t * f32(3))
+    # sin(dist/100 + 4t) = sin(dist/100)·cos(4t) + cos(dist/100)·sin(4t): la
+    # parte que depende del píxel viene precalculada (ni raíz ni seno por píxel)
+    cos_t4, sin_t4 = math.cos(t * f32(4)), math.sin(t * f32(4))
+    for i in numba.prange(h):
+        cos_y = math.cos(y[i] + t * f32(1.5))
+        sin_y = math.sin(y[i] * f32(1.5) + t * f32(2))
+        for j in range(w):
+            combined = (sin_x[j] * cos_y + cos_x2[j] * sin_y) * half
+            ring = ring_sin[i, j] * cos_t4 + ring_cos[i, j] * sin_t4
+            # Rojo: ondas base; verde: ondas desfasadas; azul: patrón circular
+            r = (combined + one) * f32(127) + f32(64)
+            g = (math.sin(combined * pi + t) + one) * f32(127) + f32(32)
+            b = (ring + one) * f32(127) + f32(64)
+            out[i, j, 0] = np.uint8(min(max(r, zero), top))
+            out[i, j, 1] = np.uint8(min(max(g, zero), top))
+            out[i, j, 2] = np.uint8(min(max(b, zero), top))
 
-def create_dynamic_background(size: Tuple[int, int], duration: float) -> VideoClip:
-    """Crea un fondo dinámico con ondas y colores"""
+def create_dynamic_background(size: Tuple[int, int], duration: float, scale: float = 1.0) -> VideoClip:
+    """Crea un fondo dinámico con ondas y colores (medidas en píxeles multiplicadas por scale)"""
     w, h = size
     
+    # Coordenadas de las ondas: no dependen de t
+    x = np.linspace(0, 4*np.pi, w, dtype=np.float32)
+    y = np.linspace(0, 6*np.pi, h, dtype=np.float32)
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+    
+    # Patrón circular: la distancia al centro tampoco depende de t
+    center_x, center_y = w // 2, h // 2
+    dist = np.sqrt((np.arange(w) - center_x)[None, :]**2 + (np.arange(h) - center_y)[:, None]**2)
+    ring_sin = np.sin(dist / (100 * scale)).astype(np.float32)
+    ring_cos = np.cos(dist / (100 * scale)).astype(np.float32)
+    
     def make_frame(t):
-        # Crear patrones ondulados dinámicos
-        x = np.linspace(0, 4*np.pi, w)
-        y = np.linspace(0, 6*np.pi, h)
-        X, Y = np.meshgrid(x, y)
-        
-        # Ondas que cambian con el tiempo
-        wave1 = np.sin(X + t * 2) * np.cos(Y + t * 1.5)
-        wave2 = np.cos(X * 2 + t * 3) * np.sin(Y * 1.5 + t * 2)
-        combined = (wave1 + wave2) / 2
-        
-        # Convertir a colores RGB vibrantes
-        # Canal rojo: ondas base
-        r = np.clip((combined + 1) * 127 + 64, 0, 255)
-        # Canal verde: ondas desfasadas
-        g = np.clip((np.sin(combined * np.pi + t) + 1) * 127 + 32, 0, 255)
-        # Canal azul: patrón circular
-        center_x, center_y = w//2, h//2
-        dist = np.sqrt((np.arange(w) - center_x)**2 + (np.arange(h)[:, None] - center_y)**2)
-        b = np.clip((np.sin(dist/100 + t*4) + 1) * 127 + 64, 0, 255)
-        
-        # Combinar canales
-        frame = np.stack([r, g, b], axis=2).astype(np.uint8)
-        
+        # Patrones ondulados dinámicos convertidos a colores RGB vibrantes
+        _dynamic_background_kernel(float(t), x, y, ring_sin, ring_cos, frame)
         return frame
     
     return VideoClip(make_frame, duration=duration)
 
-def create_geometric_overlay(size: Tuple[int, int], duration: float) -> VideoClip:
-    """Crea overlay geométrico animado"""
+def create_geometric_overlay(size: Tuple[int, int], duration: float, scale: float = 1.0) -> VideoClip:
+    """Crea overlay geométrico animado (medidas en píxeles multiplicadas por scale)"""
     w, h = size
     
+    # Coordenadas de los píxeles, comunes a todos los frames y círculos (int32:
+    # los cuadrados de distancias caben de sobra y la máscara es exacta)
+    y_indices, x_indices = np.ogrid[:h, :w]
+    y_indices, x_indices = y_indices.astype(np.int32), x_indices.astype(np.int32)
+    
+    # Frame reutilizado entre llamadas
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+    
     def make_frame(t):
-        frame = np.zeros((h, w, 3), dtype=np.uint8)
+        frame.fill(0)
         
         # Círculos pulsantes
         center_x, center_y = w//2, h//2
         
         # Círculo principal que pulsa
         pulse = abs(math.sin(t * 4)) * 0.8 + 0.2
-        radius = int(200 * pulse)
+        radius = int(200 * scale * pulse)
         
         # Crear múltiples círculos
         for i, (cx, cy) in enumerate([(center_x, center_y//3), (center_x, center_y), (center_x, center_y*4//3)]):
             phase = t * 3 + i * 2
-            r = int(150 * (abs(math.sin(phase)) * 0.6 + 0.4))
+            r = int(150 * scale * (abs(math.sin(phase)) * 0.6 + 0.4))
             
-            # Dibujar círculo (aproximación con cuadrados)
-            y_indices, x_indices = np.ogrid[:h, :w]
-            mask = (x_indices - cx)**2 + (y_indices - cy)**2 <= r**2
+            # Dibujar círculo: la máscara solo se evalúa en su caja envolvente
+            y0, y1 = max(0, cy - r), min(h, cy + r + 1)
+            x0, x1 = max(0, cx - r), min(w, cx + r + 1)
+            mask = (x_indices[:, x0:x1] - cx)**2 + (y_indices[y0:y1] - cy)**2 <= r**2
             
             # Color basado en el tiempo y posición
             color_r = int(127 * (math.sin(phase) + 1))
             color_g = int(127 * (math.cos(phase + 1) + 1))
             color_b = int(127 * (math.sin(phase + 2) + 1))
             
-            frame[mask] = [color_r, color_g, color_b]
+            frame[y0:y1, x0:x1][mask] = [color_r, color_g, color_b]
         
         # Líneas dinámicas
-        line_y = int(h/2 + 200 * math.sin(t * 2))
+        line_y = int(h/2 + 200 * scale * math.sin(t * 2))
+        line_half = int(5 * scale)
         if 0 <= line_y < h:
-            frame[max(0, line_y-5):min(h, line_y+5), :] = [255, 255, 0]  # Línea amarilla
+            frame[max(0, line_y-line_half):min(h, line_y+line_half), :] = [255, 255, 0]  # Línea amarilla
         
         return frame
     
     return VideoClip(make_frame, duration=duration).with_opacity(0.6)
 
-def create_particle_system(size: Tuple[int, int], duration: float) -> VideoClip:
-    """Crea sistema de partículas animadas"""
+@numba.njit(fastmath=True, cache=True, boundscheck=False)
+def _draw_particles_kernel(xs, ys, sizes, brightness, disk_masks, out):
+    # Estampa cada partícula con su máscara circular, recortada a los bordes
+    # del frame; en orden, así que si dos se solapan la última gana
+    h, w = out.shape[0], out.shape[1]
+    center = disk_masks.shape[1] // 2
+    for p in range(xs.shape[0]):
+        px, py, size, bright = xs[p], ys[p], sizes[p], brightness[p]
+        for dy in range(-size, size + 1):
+            y = py + dy
+            if y < 0 or y >= h:
+                continue
+            for dx in range(-size, size + 1):
+                x = px + dx
+                if 0 <= x < w and disk_masks[size, center + dy, center + dx]:
+                    out[y, x, 0] = bright
+                    out[y, x, 1] = bright // 2
+                    out[y, x, 2] = bright // 3
+
+def create_particle_system(size: Tuple[int, int], duration: float, scale: float = 1.0) -> VideoClip:
+    """Crea sistema de partículas animadas (medidas en píxeles multiplicadas por scale)"""
     w, h = size
     
-    # Generar partículas
+    # Generar partículas: un array float32 por atributo (estructura de arrays),
+    # sorteados en el mismo orden que antes (x, y, vx, vy, tamaño, fase)
     num_particles = 50
-    particles = []
-    for _ in range(num_particles):
-        particles.append({
-            'x': random.randint(0, w),
-            'y': random.randint(0, h),
-            'vx': random.uniform(-2, 2),
-            'vy': random.uniform(-3, 1),
-            'size': random.randint(3, 8),
-            'phase': random.uniform(0, 2*math.pi)
-        })
+    attrs = np.array([
+        (random.randint(0, w), random.randint(0, h), random.uniform(-2, 2),
+         random.uniform(-3, 1), random.randint(3, MAX_PARTICLE_SIZE), random.uniform(0, 2*math.pi))
+        for _ in range(num_particles)
+    ], dtype=np.float32)
+    pos_x, pos_y, vel_x, vel_y, sizes, phases = attrs.T.copy()
+    sizes = np.maximum(1, np.rint(sizes * scale)).astype(np.int64)
+    
+    # Frame reutilizado entre llamadas
+    frame = np.empty((h, w, 3), dtype=np.uint8)
     
     def make_frame(t):
-        frame = np.zeros((h, w, 3), dtype=np.uint8)
+        frame.fill(0)
         
-        for p in particles:
-            # Actualizar posición
-            x = (p['x'] + p['vx'] * t * 30) % w
-            y = (p['y'] + p['vy'] * t * 30) % h
-            
-            # Brillo pulsante
-            brightness = int(255 * (math.sin(t * 3 + p['phase']) * 0.4 + 0.6))
-            
-            # Dibujar partícula
-            px, py = int(x), int(y)
-            size = p['size']
-            
-            # Crear máscara circular para la partícula
-            for dy in range(-size, size+1):
-                for dx in range(-size, size+1):
-                    if dx*dx + dy*dy <= size*size:
-                        nx, ny = px + dx, py + dy
-                        if 0 <= nx < w and 0 <= ny < h:
-                            frame[ny, nx] = [brightness, brightness//2, brightness//3]
+        # Posiciones y brillo (pulsante) de todas las partículas a la vez
+        step = np.float32(t * 30 * scale)
+        xs = np.mod(pos_x + vel_x * step, w).astype(np.int64)
+        ys = np.mod(pos_y + vel_y * step, h).astype(np.int64)
+        brightness = (255 * (np.sin(np.float32(t * 3) + phases) * 0.4 + 0.6)).astype(np.int64)
+        
+        _draw_particles_kernel(xs, ys, sizes, brightness, DISK_MASKS, frame)
         
         return frame
     
     return VideoClip(make_frame, duration=duration).with_opacity(0.7)
 
-def create_beat_bars(size: Tuple[int, int], duration: float) -> VideoClip:
-    """Crea barras de visualización de audio"""
+def create_beat_bars(size: Tuple[int, int], duration: float, scale: float = 1.0) -> VideoClip:
+    """Crea barras de visualización de audio (medidas en píxeles multiplicadas por scale)"""
     w, h = size
     
+    # Número de barras
+    num_bars = 20
+    bar_width = w // num_bars
+    bar_gap = max(1, int(2 * scale))
+    
+    # Frecuencia simulada y desfase de cada barra
+    freqs = (np.arange(num_bars) + 1) * 100 / 50
+    offsets = np.arange(num_bars) * 0.5
+    x_starts = (np.arange(num_bars) * bar_width).tolist()
+    
+    # Frame reutilizado entre llamadas
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+    
     def make_frame(t):
-        frame = np.zeros((h, w, 3), dtype=np.uint8)
+        frame.fill(0)
         
-        # Número de barras
-        num_bars = 20
-        bar_width = w // num_bars
+        # Altura de todas las barras basada en frecuencias simuladas
+        intensity = np.abs(np.sin(t * freqs + offsets)) * 0.8 + 0.2
+        bar_heights = (h * 0.3 * intensity).astype(np.int64)
         
-        for i in range(num_bars):
-            # Altura de cada barra basada en frecuencias simuladas
-            frequency = (i + 1) * 100  # Frecuencia simulada
-            phase = t * frequency / 50 + i * 0.5
-            intensity = abs(math.sin(phase)) * 0.8 + 0.2
-            
-            bar_height = int(h * 0.3 * intensity)
-            
-            # Posición de la barra
-            x_start = i * bar_width
-            x_end = x_start + bar_width - 2
-            y_start = h - bar_height
-            
-            # Color basado en intensidad
-            color_intensity = int(255 * intensity)
-            color = [color_intensity//3, color_intensity//2, color_intensity]
-            
-            # Dibujar barra
-            frame[y_start:h, x_start:x_end] = color
+        # Color basado en intensidad
+        color_intensity = (255 * intensity).astype(np.int64)
+        colors = np.stack([color_intensity//3, color_intensity//2, color_intensity], axis=1).astype(np.uint8)
+        
+        # Dibujar cada barra: una asignación de bloque por barra, con los
+        # parámetros ya calculados
+        for x_start, y_start, color in zip(x_starts, (h - bar_heights).tolist(), colors):
+            frame[y_start:h, x_start:x_start + bar_width - bar_gap] = color
         
         return frame
     
     return VideoClip(make_frame, duration=duration)
 
-def create_text_simulation(size: Tuple[int, int], duration: float, concept: Dict[str, Any]) -> VideoClip:
-    """Simula texto con efectos visuales (sin usar TextClip)"""
+def create_text_simulation(size: Tuple[int, int], duration: float, concept: Dict[str, Any], scale: float = 1.0) -> VideoClip:
+    """Simula texto con efectos visuales, sin usar TextClip (medidas en píxeles multiplicadas por scale)"""
     w, h = size
     
-    def make_frame(t):
-        frame = np.zeros((h, w, 3), dtype=np.uint8)
+    # Simular diferentes secciones de texto con rectángulos de colores: cada
+    # sección dibuja su rectángulo en el frame según su progreso propio
+    def draw_title(frame, t, title_progress):
+        # Rectángulo para título - efecto typewriter
+        title_width = int(w * 0.8 * title_progress)
+        title_height = int(80 * scale)
+        title_y = h // 6
+        title_x = (w - title_width) // 2
         
-        # Simular diferentes secciones de texto con rectángulos de colores
-        progress = (t / duration) % 1.0
+        frame[title_y:title_y+title_height, title_x:title_x+title_width] = [255, 215, 0]  # Dorado
+    
+    def draw_hook(frame, t, hook_progress):
+        pulse = abs(math.sin(t * 8)) * 0.3 + 0.7
         
-        # Título (primeros 20%)
-        if progress < 0.2:
-            # Rectángulo para título - efecto typewriter
-            title_progress = progress / 0.2
-            title_width = int(w * 0.8 * title_progress)
-            title_height = 80
-            title_y = h // 6
-            title_x = (w - title_width) // 2
-            
-            frame[title_y:title_y+title_height, title_x:title_x+title_width] = [255, 215, 0]  # Dorado
+        hook_width = int(w * 0.7)
+        hook_height = int(60 * scale * pulse)
+        hook_y = h // 3
+        hook_x = (w - hook_width) // 2
         
-        # Hook (20%-40%)
-        elif progress < 0.4:
-            hook_progress = (progress - 0.2) / 0.2
-            pulse = abs(math.sin(t * 8)) * 0.3 + 0.7
-            
-            hook_width = int(w * 0.7)
-            hook_height = int(60 * pulse)
-            hook_y = h // 3
-            hook_x = (w - hook_width) // 2
-            
-            brightness = int(255 * pulse)
-            frame[hook_y:hook_y+hook_height, hook_x:hook_x+hook_width] = [brightness, brightness//2, 0]
+        brightness = int(255 * pulse)
+        frame[hook_y:hook_y+hook_height, hook_x:hook_x+hook_width] = [brightness, brightness//2, 0]
+    
+    def draw_development(frame, t, dev_progress):
+        slide_x = int(w * (dev_progress - 0.5))
         
-        # Development (40%-70%)
-        elif progress < 0.7:
-            dev_progress = (progress - 0.4) / 0.3
-            slide_x = int(w * (dev_progress - 0.5))
-            
-            dev_width = int(w * 0.6)
-            dev_height = 50
-            dev_y = h // 2
-            final_x = max(0, min(w - dev_width, slide_x + w//4))
-            
-            frame[dev_y:dev_y+dev_height, final_x:final_x+dev_width] = [0, 255, 255]  # Cian
+        dev_width = int(w * 0.6)
+        dev_height = int(50 * scale)
+        dev_y = h // 2
+        final_x = max(0, min(w - dev_width, slide_x + w//4))
         
-        # Climax (70%-90%)
-        elif progress < 0.9:
-            climax_progress = (progress - 0.7) / 0.2
-            explosion = abs(math.sin(t * 12)) * 0.5 + 0.5
-            
-            climax_width = int(w * 0.8 * explosion)
-            climax_height = int(100 * explosion)
-            climax_y = h * 2 // 3
-            climax_x = (w - climax_width) // 2
-            
-            frame[climax_y:climax_y+climax_height, climax_x:climax_x+climax_width] = [255, 0, 255]  # Magenta
+        frame[dev_y:dev_y+dev_height, final_x:final_x+dev_width] = [0, 255, 255]  # Cian
+    
+    def draw_climax(frame, t, climax_progress):
+        explosion = abs(math.sin(t * 12)) * 0.5 + 0.5
+        
+        climax_width = int(w * 0.8 * explosion)
+        climax_height = int(100 * scale * explosion)
+        climax_y = h * 2 // 3
+        climax_x = (w - climax_width) // 2
         
-        # Hashtags (90%-100%)
-        else:
-            hashtag_progress = (progress - 0.9) / 0.1
+        frame[climax_y:climax_y+climax_height, climax_x:climax_x+climax_width] = [255, 0, 255]  # Magenta
+    
+    def draw_hashtags(frame, t, hashtag_progress):
+        for i in range(3):  # 3 hashtags simulados
+            tag_width = int(w * 0.25)
+            tag_height = int(30 * scale)
+            tag_y = h - int((200 - i * 50) * scale)
+            tag_x = int(w * 0.1 + (w * 0.8 * hashtag_progress))
             
-            for i in range(3):  # 3 hashtags simulados
-                tag_width = int(w * 0.25)
-                tag_height = 30
-                tag_y = h - 200 + i * 50
-                tag_x = int(w * 0.1 + (w * 0.8 * hashtag_progress))
-                
-                if tag_x < w:
-                    end_x = min(w, tag_x + tag_width)
-                    frame[tag_y:tag_y+tag_height, tag_x:end_x] = [255, 255, 255]  # Blanco
+            if tag_x < w:
+                end_x = min(w, tag_x + tag_width)
+                frame[tag_y:tag_y+tag_height, tag_x:end_x] = [255, 255, 255]  # Blanco
+    
+    # Secciones: título (0-20%), hook (20-40%), development (40-70%),
+    # climax (70-90%) y hashtags (90-100%)
+    starts = np.array([0.0, 0.2, 0.4, 0.7, 0.9])
+    lengths = [0.2, 0.2, 0.3, 0.2, 0.1]
+    sections = {0: draw_title, 1: draw_hook, 2: draw_development, 3: draw_climax, 4: draw_hashtags}
+    
+    # Frame reutilizado entre llamadas
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+    
+    def make_frame(t):
+        frame.fill(0)
+        
+        progress = (t / duration) % 1.0
+        section = int(np.searchsorted(starts, progress, side='right')) - 1
+        sections[section](frame, t, (progress - starts[section]) / lengths[section])
         
         return frame
     
     return VideoClip(make_frame, duration=duration).with_opacity(0.8)
 
-def render_wow_reel_simple(concept: Dict[str, Any], audio_path: str, output_path: str) -> str:
-    """Renderiza un reel con efectos WOW usando solo efectos procedurales"""
+def build_reel_clip(concept: Dict[str, Any], duration: float, seed: int) -> VideoClip:
+    """
+    Construye el clip final (sin audio) a partir de sus capas.
     
-    print("🎬 Iniciando renderizado WOW (modo simple)...")
+    Las partículas salen de random, así que con la misma semilla el clip es
+    idéntico: así cada proceso de renderizado puede construir el suyo.
+    """
+    random.seed(seed)
     
-    # Cargar audio
-    audio_clip = AudioFileClip(audio_path)
-    duration = audio_clip.duration
-    
-    print(f"📽️ Duración del audio: {duration:.2f}s")
-    
-    # Crear capas de efectos
-    print("🎨 Creando efectos visuales...")
+    # Todas las capas se generan a RENDER_SIZE
     
     # 1. Fondo dinámico
-    background = create_dynamic_background(DEFAULT_SIZE, duration)
+    background = create_dynamic_background(RENDER_SIZE, duration, scale=RENDER_SCALE)
     
     # 2. Overlay geométrico
-    geometric = create_geometric_overlay(DEFAULT_SIZE, duration)
+    geometric = create_geometric_overlay(RENDER_SIZE, duration, scale=RENDER_SCALE)
     
     # 3. Sistema de partículas
-    particles = create_particle_system(DEFAULT_SIZE, duration)
+    particles = create_particle_system(RENDER_SIZE, duration, scale=RENDER_SCALE)
     
     # 4. Barras de visualización
-    beat_bars = create_beat_bars(DEFAULT_SIZE, duration)
+    beat_bars = create_beat_bars(RENDER_SIZE, duration, scale=RENDER_SCALE)
     
     # 5. Simulación de texto
-    text_sim = create_text_simulation(DEFAULT_SIZE, duration, concept)
+    text_sim = create_text_simulation(RENDER_SIZE, duration, concept, scale=RENDER_SCALE)
     
-    print("🎭 Componiendo video final...")
-    
-    # Componer todas las capas
+    # Componer todas las capas en un solo clip: las capas se mezclan en un
+    # único frame reutilizado, sin el CompositeVideoClip de MoviePy
     clips = [background, geometric, particles, beat_bars, text_sim]
     
-    final_video = CompositeVideoClip(clips, size=DEFAULT_SIZE)
-    final_video = final_video.with_audio(audio_clip).with_duration(duration)
+    return composite_layers(clips, RENDER_SIZE, duration)
+
+def render_wow_reel_simple(concept: Dict[str, Any], audio_path: str, output_path: str) -> str:
+    """Renderiza un reel con efectos WOW usando solo efectos procedurales"""
+    
+    print("🎬 Iniciando renderizado WOW (modo simple)...")
+    
+    # Cargar audio
+    audio_clip = AudioFileClip(audio_path)
+    duration = audio_clip.duration
+    
+    print(f"📽️ Duración del audio: {duration:.2f}s")
+    
+    # Crear capas de efectos y componerlas
+    print("🎨 Creando efectos visuales...")
+    print("🎭 Componiendo video final...")
+    
+    seed = random.randrange(2**32)
+    final_video = build_reel_clip(concept, duration, seed)
     
     # Asegurar que el directorio existe
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
     print("🔄 Renderizando video...")
     
-    # Renderizar
-    final_video.write_videofile(
-        output_path,
-        fps=DEFAULT_FPS,
-        codec='libx264',
-        audio_codec='aac',
-        temp_audiofile='temp-audio.m4a',
-        remove_temp=True
-    )
+    # Renderizar: frames directos a ffmpeg, que añade el audio original y
+    # amplía el vídeo a DEFAULT_SIZE; los frames no dependen de los anteriores
+    # y se generan en varios procesos, cada uno con su copia del clip
+    write_video_ffmpeg(final_video, audio_path, output_path, workers=os.cpu_count() or 1,
+                       clip_factory=functools.partial(build_reel_clip, concept, duration, seed),
+                       output_size=DEFAULT_SIZE)
     
     # Limpiar
     final_video.close()
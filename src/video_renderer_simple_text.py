@@ -6,6 +6,7 @@ SUPER SIMPLE pero 100% FUNCIONAL
 
 import os
 import json
+import functools
 import math
 from typing import Dict, Any, Tuple, List
 import numpy as np
@@ -18,6 +19,8 @@ except ImportError:
     from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
     from moviepy.audio.io.AudioFileClip import AudioFileClip
 
+from video_renderer_enhanced import write_video_ffmpeg
+
 DEFAULT_SIZE = (1080, 1920)  # 9:16 vertical
 DEFAULT_FPS = 30
 
@@ -25,21 +28,26 @@ def create_simple_background(size: Tuple[int, int], duration: float) -> VideoCli
     """Fondo simple que cambia de color cada 10 segundos"""
     w, h = size
     
+    colors = [
+        [50, 50, 50],    # Gris oscuro
+        [100, 0, 0],     # Rojo oscuro
+        [0, 100, 0],     # Verde oscuro
+        [0, 0, 100],     # Azul oscuro
+        [100, 100, 0],   # Amarillo oscuro
+        [100, 0, 100],   # Magenta oscuro
+    ]
+    
+    # El color solo cambia cada 10 segundos: cada frame de color se genera
+    # la primera vez que se pide y se reutiliza en el resto
+    cached = {}
+    
     def make_frame(t):
         # Cambiar color cada 10 segundos
         color_index = int(t / 10) % 6
         
-        colors = [
-            [50, 50, 50],    # Gris oscuro
-            [100, 0, 0],     # Rojo oscuro
-            [0, 100, 0],     # Verde oscuro
-            [0, 0, 100],     # Azul oscuro
-            [100, 100, 0],   # Amarillo oscuro
-            [100, 0, 100],   # Magenta oscuro
-        ]
-        
-        color = colors[color_index]
-        frame = np.full((h, w, 3), color, dtype=np.uint8)
+        frame = cached.get(color_index)
+        if frame is None:
+            frame = cached[color_index] = np.full((h, w, 3), colors[color_index], dtype=np.uint8)
         return frame
     
     return VideoClip(make_frame, duration=duration)
@@ -57,8 +65,11 @@ def create_lyrics_display(size: Tuple[int, int], duration: float, concept: Dict[
     # Calcular cuándo aparece cada palabra
     word_duration = duration / len(words)
     
+    # Frame reutilizado entre llamadas
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+    
     def make_frame(t):
-        frame = np.zeros((h, w, 3), dtype=np.uint8)
+        frame.fill(0)
         
         # Calcular cuántas palabras mostrar
         current_word_index = int(t / word_duration)
@@ -114,24 +125,33 @@ def create_beat_indicator(size: Tuple[int, int], duration: float) -> VideoClip:
     """Indicador simple de beat que pulsa"""
     w, h = size
     
+    # Círculo que pulsa en el centro: el radio va de 100 a 150, así que la
+    # distancia² al centro se precalcula una vez en la caja del radio máximo
+    center_x, center_y = w // 2, h // 2
+    max_radius = 150
+    y0, y1 = max(0, center_y - max_radius), min(h, center_y + max_radius + 1)
+    x0, x1 = max(0, center_x - max_radius), min(w, center_x + max_radius + 1)
+    y_indices, x_indices = np.ogrid[y0:y1, x0:x1]
+    dist_sq = (x_indices - center_x)**2 + (y_indices - center_y)**2
+    
+    # Frame reutilizado entre llamadas
+    frame = np.empty((h, w, 3), dtype=np.uint8)
+    
     def make_frame(t):
-        frame = np.zeros((h, w, 3), dtype=np.uint8)
+        frame.fill(0)
         
         # Pulsar al ritmo (126 BPM = 2.1 Hz)
         beat_freq = 2.1
         pulse = abs(math.sin(t * beat_freq * 2 * math.pi))
         
-        # Círculo que pulsa en el centro
-        center_x, center_y = w // 2, h // 2
         radius = int(100 + 50 * pulse)
         
-        # Dibujar círculo pulsante
-        y_indices, x_indices = np.ogrid[:h, :w]
-        circle_mask = (x_indices - center_x)**2 + (y_indices - center_y)**2 <= radius**2
+        # Dibujar círculo pulsante: solo un umbral sobre la distancia precalculada
+        circle_mask = dist_sq <= radius**2
         
         # Color rojo que cambia de intensidad
         intensity = int(255 * pulse)
-        frame[circle_mask] = [intensity, 0, 0]
+        frame[y0:y1, x0:x1][circle_mask] = [intensity, 0, 0]
         
         return frame
     
@@ -141,41 +161,30 @@ def create_progress_bar(size: Tuple[int, int], duration: float) -> VideoClip:
     """Barra de progreso simple"""
     w, h = size
     
+    # Barra en la parte inferior: el clip es solo la franja de la barra, así
+    # que no tapa el resto de capas
+    bar_y = h - 100
+    bar_height = 20
+    border = 2
+    
+    # Borde blanco dibujado una vez; en cada frame solo se rellena el interior
+    frame = np.zeros((bar_height, w, 3), dtype=np.uint8)
+    frame[:border, :] = frame[-border:, :] = [255, 255, 255]  # Blanco
+    frame[:, :border] = frame[:, -border:] = [255, 255, 255]
+    inside = frame[border:-border, border:-border]
+    
     def make_frame(t):
-        frame = np.zeros((h, w, 3), dtype=np.uint8)
-        
-        # Calcular progreso
-        progress = t / duration
-        
-        # Barra en la parte inferior
-        bar_y = h - 100
-        bar_height = 20
-        
         # Llenar barra según progreso
-        bar_width = int(w * progress)
-        frame[bar_y:bar_y+bar_height, :bar_width] = [0, 255, 255]  # Cian
-        
-        # Borde de la barra
-        frame[bar_y:bar_y+bar_height, :] = [255, 255, 255]  # Blanco
-        
+        progress = t / duration
+        bar_width = min(inside.shape[1], int(inside.shape[1] * progress))
+        inside[:, :bar_width] = [0, 255, 255]  # Cian
+        inside[:, bar_width:] = 0
         return frame
     
-    return VideoClip(make_frame, duration=duration)
+    return VideoClip(make_frame, duration=duration).with_position((0, bar_y))
 
-def render_simple_lyrics_video(concept: Dict[str, Any], audio_path: str, output_path: str) -> str:
-    """Renderiza video simple con letra sincronizada"""
-    
-    print("🎵 Iniciando renderizado SIMPLE con letra...")
-    
-    # Cargar audio
-    audio_clip = AudioFileClip(audio_path)
-    duration = audio_clip.duration
-    
-    print(f"📽️ Duración del audio: {duration:.2f}s")
-    
-    # Crear capas SIMPLES
-    print("🎨 Creando efectos SIMPLES...")
-    
+def build_lyrics_clip(concept: Dict[str, Any], duration: float) -> VideoClip:
+    """Construye el clip final (sin audio) a partir de sus capas"""
     # 1. Fondo simple
     background = create_simple_background(DEFAULT_SIZE, duration)
     
@@ -188,28 +197,39 @@ def render_simple_lyrics_video(concept: Dict[str, Any], audio_path: str, output_
     # 4. Barra de progreso
     progress_bar = create_progress_bar(DEFAULT_SIZE, duration)
     
-    print("🎭 Componiendo video simple...")
-    
     # Componer capas
     clips = [background, lyrics, beat_indicator, progress_bar]
     
     final_video = CompositeVideoClip(clips, size=DEFAULT_SIZE)
-    final_video = final_video.with_audio(audio_clip).with_duration(duration)
+    return final_video.with_duration(duration)
+
+def render_simple_lyrics_video(concept: Dict[str, Any], audio_path: str, output_path: str) -> str:
+    """Renderiza video simple con letra sincronizada"""
+    
+    print("🎵 Iniciando renderizado SIMPLE con letra...")
+    
+    # Cargar audio
+    audio_clip = AudioFileClip(audio_path)
+    duration = audio_clip.duration
+    
+    print(f"📽️ Duración del audio: {duration:.2f}s")
+    
+    # Crear capas SIMPLES y componerlas
+    print("🎨 Creando efectos SIMPLES...")
+    print("🎭 Componiendo video simple...")
+    
+    final_video = build_lyrics_clip(concept, duration)
     
     # Asegurar directorio
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
     print("🔄 Renderizando video simple...")
     
-    # Renderizar
-    final_video.write_videofile(
-        output_path,
-        fps=DEFAULT_FPS,
-        codec='libx264',
-        audio_codec='aac',
-        temp_audiofile='temp-audio.m4a',
-        remove_temp=True
-    )
+    # Renderizar: frames directos a ffmpeg, que añade el audio original; los
+    # frames no dependen de los anteriores y se generan en varios procesos,
+    # cada uno con su copia del clip
+    write_video_ffmpeg(final_video, audio_path, output_path, workers=os.cpu_count() or 1,
+                       clip_factory=functools.partial(build_lyrics_clip, concept, duration))
     
     # Limpiar
     final_video.close()
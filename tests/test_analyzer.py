@@ -5,17 +5,28 @@ Script de prueba para el analizador de música
 
 import sys
 import os
+import functools
+
+import numpy as np
 
 # Agregar el directorio src al path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from music_analyzer_improved import ImprovedMusicAnalyzer
 
+@functools.lru_cache(maxsize=1)
+def _get_analyzer() -> ImprovedMusicAnalyzer:
+    """Analizador compartido por todas las pruebas (el modelo se carga una sola vez)."""
+    analyzer = ImprovedMusicAnalyzer()
+    # Calentar el léxico de sentimiento (~1 s la primera vez) fuera de las pruebas
+    analyzer.analyze_sentiment_improved("warmup")
+    return analyzer
+
 def test_sentiment_analysis():
     """Prueba el análisis de sentimiento con textos conocidos."""
     print("🧪 Probando análisis de sentimiento...")
     
-    analyzer = ImprovedMusicAnalyzer()
+    analyzer = _get_analyzer()
     
     # Textos de prueba
     test_texts = [
@@ -25,49 +36,44 @@ def test_sentiment_analysis():
         "Fire and passion, burning desire!"
     ]
     
-    for text in test_texts:
-        print(f"\n📝 Texto: '{text}'")
-        sentiment = analyzer.analyze_sentiment_improved(text)
-        print(f"   Sentimiento: {sentiment['sentiment']}")
-        print(f"   Polaridad: {sentiment['polarity']:.3f}")
-        print(f"   Emociones: {sentiment['emotions']}")
+    results = analyzer.analyze_sentiment_batch(test_texts)
+    for text, sentiment in zip(test_texts, results):
+        # Una sola escritura por texto
+        print("\n".join([
+            f"\n📝 Texto: '{text}'",
+            f"   Sentimiento: {sentiment['sentiment']}",
+            f"   Polaridad: {sentiment['polarity']:.3f}",
+            f"   Emociones: {sentiment['emotions']}",
+        ]))
 
 def test_audio_features():
     """Prueba el análisis de características de audio."""
     print("\n🔍 Probando análisis de características de audio...")
     
     # Crear audio de prueba simple
-    import numpy as np
-    import soundfile as sf
-    
     # Generar 5 segundos de audio de prueba
     sample_rate = 44100
     duration = 5
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
-    audio = 0.3 * np.sin(2 * np.pi * 440 * t)  # Nota A4
+    n_samples = sample_rate * duration
+    phase_step = np.float32(2 * np.pi * 440 / sample_rate)  # Nota A4
+    # Un solo buffer float32: fase, seno y amplitud se calculan en el sitio
+    audio = np.arange(n_samples, dtype=np.float32)
+    audio *= phase_step
+    np.sin(audio, out=audio)
+    audio *= np.float32(0.3)
     
-    # Guardar audio de prueba
-    test_audio_path = "test_audio.wav"
-    sf.write(test_audio_path, audio, sample_rate)
+    # El análisis trabaja sobre el array en memoria: no hace falta escribir un WAV
+    analyzer = _get_analyzer()
+    features = analyzer._analyze_audio_features(audio, sample_rate)
     
-    try:
-        analyzer = ImprovedMusicAnalyzer()
-        features = analyzer._analyze_audio_features(audio, sample_rate)
-        
-        print(f"✅ Características analizadas:")
-        for key, value in features.items():
-            print(f"   {key}: {value}")
-            
-    finally:
-        # Limpiar archivo de prueba
-        if os.path.exists(test_audio_path):
-            os.remove(test_audio_path)
+    print("\n".join([f"✅ Características analizadas:"] +
+                    [f"   {key}: {value}" for key, value in features.items()]))
 
 def test_transcription_confidence():
     """Prueba el cálculo de confianza de transcripción."""
     print("\n📊 Probando cálculo de confianza...")
     
-    analyzer = ImprovedMusicAnalyzer()
+    analyzer = _get_analyzer()
     
     test_texts = [
         "",  # Texto vacío
@@ -78,24 +84,20 @@ def test_transcription_confidence():
     ]
     
     for text in test_texts:
+        preview = text[:30] + ('...' if len(text) > 30 else '')
         confidence = analyzer._calculate_transcription_confidence(text)
-        print(f"   Texto: '{text[:30]}{'...' if len(text) > 30 else ''}'")
-        print(f"   Confianza: {confidence:.1%}")
+        print(f"   Texto: '{preview}'\n"
+              f"   Confianza: {confidence:.1%}")
 
 if __name__ == "__main__":
     print("🧪 INICIANDO PRUEBAS DEL ANALIZADOR DE MÚSICA")
     print("=" * 60)
     
-    try:
-        test_sentiment_analysis()
-        test_audio_features()
-        test_transcription_confidence()
-        
-        print("\n" + "=" * 60)
-        print("✅ TODAS LAS PRUEBAS COMPLETADAS EXITOSAMENTE")
-        print("=" * 60)
-        
-    except Exception as e:
-        print(f"\n❌ Error durante las pruebas: {str(e)}")
-        import traceback
-        traceback.print_exc()
+    # Sin try/except: un fallo muestra el traceback y termina con código distinto de cero
+    test_sentiment_analysis()
+    test_audio_features()
+    test_transcription_confidence()
+    
+    print("\n" + "=" * 60)
+    print("✅ TODAS LAS PRUEBAS COMPLETADAS EXITOSAMENTE")
+    print("=" * 60)
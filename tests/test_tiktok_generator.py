@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la extracción del JSON de las respuestas del generador de TikTok
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+# Agregar el directorio src al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from tiktok_generator import TikTokReelGenerator, VARIATION_STYLES, _JsonSpanScanner, _find_json_span
+
+def _extract(text):
+    """Texto del primer objeto JSON completo, o None."""
+    span = _find_json_span(text)
+    return None if span is None else text[span[0]:span[1]]
+
+def _feed_chunks(chunks):
+    """Alimenta el escáner por trozos; devuelve (objeto, trozos consumidos)."""
+    scanner = _JsonSpanScanner()
+    for i, chunk in enumerate(chunks, 1):
+        span = scanner.feed(chunk)
+        if span is not None:
+            return scanner.text[span[0]:span[1]], i
+    return None, len(chunks)
+
+def test_braces_inside_strings():
+    """Las llaves dentro de cadenas no cuentan para la profundidad."""
+    text = '{"title": "a } b { c", "nested": {"x": "}}"}}'
+    assert _extract(text) == text
+
+def test_escaped_quotes():
+    """Una comilla escapada no cierra la cadena."""
+    text = r'{"title": "dijo \"}\" y se fue", "n": 1}'
+    assert _extract(text) == text
+
+def test_escaped_quote_split_across_chunks():
+    """El escape al final de un trozo se aplica al primer carácter del siguiente."""
+    text = r'{"title": "dijo \"}\" y se fue", "n": 1}'
+    for cut in range(1, len(text)):
+        obj, _ = _feed_chunks([text[:cut], text[cut:]])
+        assert obj == text, cut
+    
+    # Barra invertida escapada justo en el corte: la comilla siguiente sí cierra
+    obj, _ = _feed_chunks(['{"a": "x\\', '\\", "b": "}"}'])
+    assert obj == '{"a": "x\\\\", "b": "}"}'
+
+def test_leading_and_trailing_prose():
+    """Se ignora el texto antes y después del objeto."""
+    text = 'Aquí tienes el concepto: {"a": {"b": 1}} ¡Espero que te guste! {"c": 2}'
+    assert _extract(text) == '{"a": {"b": 1}}'
+
+def test_no_json():
+    """Sin objeto (o sin cerrar) no hay resultado."""
+    assert _extract("") is None
+    assert _extract("No puedo generar eso.") is None
+    assert _extract('{"a": "sin cerrar"') is None
+    assert _extract('{"a": "llave en cadena }') is None
+
+def test_scanner_one_char_at_a_time():
+    """Alimentar carácter a carácter da el mismo objeto que de una vez."""
+    text = 'ok {"a": "\\\\", "b": ["}", "{"], "c": {"d": "\\"}"}} fin'
+    obj, consumed = _feed_chunks(list(text))
+    assert obj == _extract(text)
+    assert consumed == text.index(' fin')
+
+class _FakeStream:
+    """Stream de respuesta simulado que registra cuántos trozos se leyeron."""
+    
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.consumed = 0
+        self.closed = False
+    
+    def __iter__(self):
+        for delta in self.deltas:
+            self.consumed += 1
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+    
+    def close(self):
+        self.closed = True
+
+def test_stream_stops_when_object_closes():
+    """El generador deja de leer el stream en cuanto se cierra el objeto JSON."""
+    generator = TikTokReelGenerator(api_key="test", use_cache=False)
+    stream = _FakeStream(['Claro: {"concept_title": "Lu', 'na \\"}\\"", "hashtags": ["#a"]', '}', ' y más texto', ' que sobra'])
+    generator._create_concept_completion = lambda messages: stream
+    
+    concept = generator._generate_reel_concept_with_summary("prompt", {"tempo": 120})
+    
+    assert concept["concept_title"] == 'Luna "}"'
+    assert concept["hashtags"] == ["#a"]
+    assert stream.consumed == 3
+    assert stream.closed
+
+def test_concepts_beyond_styles_have_distinct_cache_keys():
+    """Con más conceptos que estilos, cada concepto tiene su propio prompt y clave de caché."""
+    generator = TikTokReelGenerator(api_key="test", use_cache=False)
+    sent = []
+    
+    def fake_completion(messages):
+        sent.append(messages)
+        return _FakeStream(['{"concept_title": "x"}'])
+    
+    generator._create_concept_completion = fake_completion
+    count = 2 * len(VARIATION_STYLES) + 1
+    
+    concepts = generator.generate_multiple_concepts({"transcription": "la la"}, count=count)
+    
+    assert len(concepts) == count
+    assert len({generator._cache_key(messages) for messages in sent}) == count
+
+def _bad_request(message, body):
+    """BadRequestError (400) como los del cliente de openai, sin respuesta HTTP real."""
+    import openai
+    
+    class FakeBadRequest(openai.BadRequestError):
+        def __init__(self):
+            Exception.__init__(self, message)
+            self.message = message
+            self.body = body
+            self.param = body.get("param")
+    
+    return FakeBadRequest()
+
+def _generator_with_client(error):
+    """Generador cuyo cliente falla con error solo si se pide response_format."""
+    generator = TikTokReelGenerator(api_key="test", use_cache=False)
+    calls = []
+    
+    def create(**params):
+        calls.append(params)
+        if "response_format" in params:
+            raise error
+        return _FakeStream(['{"concept_title": "x"}'])
+    
+    generator.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return generator, calls
+
+def test_response_format_error_falls_back_to_free_json():
+    """Un 400 por response_format desactiva la salida estructurada y repite sin ella."""
+    error = _bad_request("Error code: 400 - response_format json_schema is not supported by this model",
+                         {"message": "response_format json_schema is not supported by this model"})
+    generator, calls = _generator_with_client(error)
+    
+    stream = generator._create_concept_completion([{"role": "user", "content": "hola"}])
+    
+    assert isinstance(stream, _FakeStream)
+    assert generator.structured_output is False
+    assert ["response_format" in params for params in calls] == [True, False]
+
+def test_other_bad_request_is_raised_and_keeps_structured_output():
+    """Otros 400 (p. ej. contexto demasiado largo) se propagan sin tocar la salida estructurada."""
+    import openai
+    error = _bad_request("Error code: 400 - This model's maximum context length is 8192 tokens",
+                         {"message": "This model's maximum context length is 8192 tokens"})
+    generator, calls = _generator_with_client(error)
+    
+    try:
+        generator._create_concept_completion([{"role": "user", "content": "hola"}])
+    except openai.BadRequestError as e:
+        assert e is error
+    else:
+        raise AssertionError("se esperaba BadRequestError")
+    
+    assert generator.structured_output is True
+    assert len(calls) == 1
+
+if __name__ == "__main__":
+    print("🧪 INICIANDO PRUEBAS DEL GENERADOR DE TIKTOK")
+    print("=" * 60)
+    
+    test_braces_inside_strings()
+    test_escaped_quotes()
+    test_escaped_quote_split_across_chunks()
+    test_leading_and_trailing_prose()
+    test_no_json()
+    test_scanner_one_char_at_a_time()
+    test_stream_stops_when_object_closes()
+    test_concepts_beyond_styles_have_distinct_cache_keys()
+    test_response_format_error_falls_back_to_free_json()
+    test_other_bad_request_is_raised_and_keeps_structured_output()
+    
+    print("✅ TODAS LAS PRUEBAS COMPLETADAS EXITOSAMENTE")
+    print("=" * 60)